@@ -0,0 +1,64 @@
+import numpy as np
+
+from bucketing import BucketTables, postflop_key, postflop_keys
+
+ACTIONS = ['fold', 'call', 'raise']
+STREETS = ['Pre-Flop', 'Flop', 'Turn', 'River']
+
+# В истории торгов учитываются последние HISTORY_DEPTH действий текущей улицы.
+HISTORY_DEPTH = 3
+_HISTORY_OFFSETS = [sum(len(ACTIONS) ** k for k in range(depth)) for depth in range(HISTORY_DEPTH + 1)]
+NUM_HISTORIES = _HISTORY_OFFSETS[-1] + len(ACTIONS) ** HISTORY_DEPTH
+
+
+def history_code(actions):
+    """Номер истории торгов улицы: длина (до HISTORY_DEPTH) и последние действия в троичной записи."""
+    recent = actions[-HISTORY_DEPTH:]
+    code = 0
+    for action in recent:
+        code = code * len(ACTIONS) + ACTIONS.index(action)
+    return _HISTORY_OFFSETS[len(recent)] + code
+
+
+class InfoSetAbstraction:
+    """Плотная нумерация информационных множеств: (корзина руки, корзина борда, история).
+
+    Номер — смешанная система счисления, поэтому таблицы регретов — обычные массивы
+    фиксированного размера без словаря ключей. Корзины берутся из таблиц bucketing:
+    по умолчанию из hand_buckets.bin, если он есть.
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets if buckets is not None else BucketTables.load_default()
+        # Корзина борда постфлоп — корзина постфлоп-ключа руки (сила комбинации и дро) на этой улице
+        self.board_buckets = self.buckets.num_postflop_buckets
+        self.num_hole_buckets = self.buckets.num_preflop_buckets
+        # Префлоп — одна корзина, на каждой следующей улице — board_buckets корзин
+        self.num_board_buckets = 1 + (len(STREETS) - 1) * self.board_buckets
+        self.num_info_sets = self.num_hole_buckets * self.num_board_buckets * NUM_HISTORIES
+
+    def hole_bucket(self, hole_cards):
+        return int(self.buckets.hole[hole_cards[0], hole_cards[1]])
+
+    def board_bucket(self, hole_cards, board):
+        if not board:
+            return 0
+        street = len(board) - 3
+        return 1 + street * self.board_buckets + int(self.buckets.postflop[street, postflop_key(hole_cards, board)])
+
+    def info_set_id(self, hole_cards, board, actions=()):
+        bucket = self.hole_bucket(hole_cards) * self.num_board_buckets + self.board_bucket(hole_cards, board)
+        return bucket * NUM_HISTORIES + history_code(list(actions))
+
+    def info_set_ids(self, holes, boards, history_codes):
+        """Векторная версия info_set_id для массивов рук (N, 2), бордов (N, k) и кодов истории."""
+        holes = np.asarray(holes)
+        boards = np.asarray(boards)
+        hole_buckets = self.buckets.hole[holes[:, 0], holes[:, 1]].astype(np.int64)
+        if boards.shape[1] == 0:
+            board_buckets = np.zeros(len(holes), dtype=np.int64)
+        else:
+            street = boards.shape[1] - 3
+            keys = postflop_keys(holes, boards)
+            board_buckets = 1 + street * self.board_buckets + self.buckets.postflop[street, keys].astype(np.int64)
+        return (hole_buckets * self.num_board_buckets + board_buckets) * NUM_HISTORIES + np.asarray(history_codes)
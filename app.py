@@ -3,22 +3,39 @@ import asyncio
 from config import PokerTournamentConfig
 from player import PokerPlayer
 from poker_game import PokerGame, setup_tournament
-from logging_system import Logger
+from logging_system import get_logger
 from database import TournamentDatabase
 from mccfr import MCCFR
+from parallel_training import train_parallel
+from tournament_snapshot import SnapshotWriter, load_game
+
+SNAPSHOT_FILE = 'tournament.snapshot'
 
 async def main():
     num_players = 160 
-    logger = Logger() 
+    logger = get_logger()
     db = TournamentDatabase()  
 
     load_previous_state = False  
 
-    mccfr_strategy = MCCFR()
-    if load_previous_state and os.path.exists('mccfr_strategy.pkl'):
-        mccfr_strategy.load_strategy('mccfr_strategy.pkl')
-    
-    game = setup_tournament(num_players=num_players, load_previous_state=load_previous_state, mccfr_strategy=mccfr_strategy)
+    training_iterations = 200000
+
+    if load_previous_state and os.path.exists(SNAPSHOT_FILE):
+        # Решатель — из контрольной точки снимка: стратегия до турнира не знает его обновлений
+        game = load_game(SNAPSHOT_FILE)
+        mccfr_strategy = game.mccfr_strategy
+        logger.log_event("Турнир восстановлен из снимка, круг %s", game.current_round)
+    else:
+        # Один решатель на весь турнир: обучается до начала игры и дообучается по ходу
+        mccfr_strategy = MCCFR()
+        if load_previous_state and os.path.exists('mccfr_strategy.bin'):
+            mccfr_strategy.load_strategy('mccfr_strategy.bin')
+        else:
+            train_parallel(mccfr_strategy, training_iterations, file_name='mccfr_strategy.bin')
+            logger.log_event("MCCFR обучен: %s итераций", training_iterations)
+        game = setup_tournament(num_players=num_players, load_previous_state=load_previous_state, mccfr_strategy=mccfr_strategy)
+    game.snapshot_writer = SnapshotWriter(SNAPSHOT_FILE)
+    game.hand_recorder = db.hand_writer(db.start_tournament(num_players))
 
     logger.log_event("Tournament started")
 
@@ -26,16 +43,22 @@ async def main():
         await game.simulate_tournament()
 
         for player in game.players:
-            logger.log_event(f"{player.name} закончил игру со стеком {player.stack}")
+            logger.log_event("%s закончил игру со стеком %s", player.name, player.stack)
             player.save_state()
 
-        mccfr_strategy.save_strategy('mccfr_strategy.pkl')
+        mccfr_strategy.save_strategy('mccfr_strategy.bin')
         logger.log_event("MCCFR стратегия сохранена.")
 
         logger.log_event("Tournament finished")
 
     except Exception as e:
-        logger.log_event(f"An error occurred: {str(e)}")
+        logger.log_event("An error occurred: %s", e)
+
+    finally:
+        game.hand_recorder.close()
+        game.snapshot_writer.close()
+        db.close()
+        logger.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
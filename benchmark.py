@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from hand_evaluator import HandEvaluator
+from mccfr import MCCFR
+from poker_game import setup_tournament
+
+# Все нагрузки детерминированы зерном: одинаковые руки, раздачи и рассадка от запуска к запуску,
+# так что результаты разных коммитов сравнимы между собой.
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def bench_evaluator(seed, scale):
+    rng = np.random.default_rng(seed)
+    hands = np.argsort(rng.random((int(200000 * scale), 52)), axis=1)[:, :7]
+    batch_seconds, _ = _timed(HandEvaluator.evaluate_batch, hands)
+
+    single = hands[:int(50000 * scale)].tolist()
+    single_seconds, _ = _timed(lambda: [HandEvaluator.evaluate_hand(hand) for hand in single])
+    return {
+        'batch_hands_per_second': len(hands) / batch_seconds,
+        'single_hands_per_second': len(single) / single_seconds,
+    }
+
+
+def bench_mccfr(seed, scale):
+    iterations = int(200000 * scale)
+    solver = MCCFR(seed=seed)
+    seconds, _ = _timed(solver.train, iterations)
+    table = solver.regret_table
+    return {
+        'iterations': iterations,
+        'iterations_per_second': iterations / seconds,
+        'info_sets': len(table),
+        'bytes_per_info_set': table.bytes_per_info_set,
+        'table_megabytes': (table.regrets.nbytes + table.strategy_sum.nbytes) / 2 ** 20,
+    }
+
+
+def bench_tournament(seed, scale, num_players):
+    solver = MCCFR(seed=seed)
+    solver.train(int(50000 * scale))
+    game = setup_tournament(num_players=num_players, mccfr_strategy=solver, headless=True, seed=seed)
+    seconds, standings = _timed(game.run_tournament)
+    return {
+        'players': num_players,
+        'seconds': seconds,
+        'rounds': game.current_round - 1,
+        'winner_stack': standings[0].stack,
+    }
+
+
+def bench_broadcast(seed, scale, num_clients=50, updates=20):
+    """Задержка рассылки: от публикации состояния до получения дельты всеми клиентами.
+
+    Клиенты — встроенные тестовые клиенты Flask-SocketIO, сеть не участвует; замеряется
+    стоимость сравнения состояний и рассылки по комнатам.
+    """
+    import web_server
+
+    solver = MCCFR(seed=seed)
+    game = setup_tournament(num_players=160, mccfr_strategy=solver, headless=True, seed=seed)
+    web_server.tournament = game
+    clients = [web_server.socketio.test_client(web_server.app) for _ in range(num_clients)]
+    for number, client in enumerate(clients):
+        client.emit('watch_table', {'table_id': game.tables[number % len(game.tables)].table_id})
+        client.get_received()
+
+    blinds = game.config.get_blinds_for_round(1)
+    latencies = []
+    for _ in range(int(updates * scale) or 1):
+        for table in game.tables:
+            game.play_hand(table, blinds)
+        started = time.perf_counter()
+        web_server.update_tournament_state({'tables': game.get_table_state()})
+        web_server.broadcaster.flush()
+        received = sum(len(client.get_received()) for client in clients)
+        latencies.append(time.perf_counter() - started)
+        if received < num_clients:
+            raise RuntimeError(f"дельту получили {received} клиентов из {num_clients}")
+
+    for client in clients:
+        client.disconnect()
+    return {
+        'clients': num_clients,
+        'updates': len(latencies),
+        'mean_latency_ms': 1000 * float(np.mean(latencies)),
+        'max_latency_ms': 1000 * float(np.max(latencies)),
+    }
+
+
+BENCHMARKS = {
+    'evaluator': bench_evaluator,
+    'mccfr': bench_mccfr,
+    'tournament_160': lambda seed, scale: bench_tournament(seed, scale, 160),
+    'tournament_10k': lambda seed, scale: bench_tournament(seed, scale, 10000),
+    'broadcast': bench_broadcast,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(names, seed=0, scale=1.0):
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        results[name] = BENCHMARKS[name](seed, scale)
+        results[name]['wall_seconds'] = time.perf_counter() - started
+    return {'environment': environment(), 'seed': seed, 'scale': scale, 'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности; результат — JSON")
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark', help=f"по умолчанию все: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scale', type=float, default=1.0, help="множитель объёма нагрузок")
+    parser.add_argument('--output', default=None, help="файл для JSON; по умолчанию stdout")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    report = json.dumps(run(args.benchmarks or list(BENCHMARKS), args.seed, args.scale), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
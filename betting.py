@@ -0,0 +1,193 @@
+from array import array
+from types import SimpleNamespace
+
+from abstraction import ACTIONS
+from hand_evaluator import HandEvaluator
+
+# Действия журнала: первые три совпадают с индексами ACTIONS, POST — блайнд, ANTE — анте
+FOLD, CALL, RAISE, POST, ANTE = range(5)
+
+
+def encode_action(seat, street, action, amount):
+    """Действие одним целым: место (5 бит), действие (3), улица (2), остальное — сумма."""
+    return (((amount << 2 | street) << 3 | action) << 5) | seat
+
+
+def decode_action(code):
+    """(место, улица, действие, сумма)."""
+    return code & 31, code >> 8 & 3, code >> 5 & 7, code >> 10
+
+
+class BettingHand:
+    """Безлимитная раздача за одним столом.
+
+    Места — в порядке seats_from_button: малый блайнд на месте 0, большой на месте 1. В хедз-апе
+    малый блайнд ставит баттон; он ходит первым на префлопе, а большой блайнд — на остальных
+    улицах. Состояние —
+    списки по местам и журнал actions: array('q') по числу на действие. Фишки списываются
+    со стеков игроков сразу при действии; apply — единственный путь изменения состояния,
+    поэтому replay журнала со стартовыми стеками starting_stacks восстанавливает раздачу
+    до любого хода.
+    """
+
+    def __init__(self, players, big_blind):
+        self.players = players
+        self.starting_stacks = [player.stack for player in players]
+        count = len(players)
+        self.big_blind = big_blind
+        self.committed = [0] * count    # поставлено на текущей улице
+        self.invested = [0] * count     # поставлено за раздачу
+        self.folded = [False] * count
+        self.all_in = [False] * count
+        self.acted = [False] * count    # ходил после последнего полного рейза
+        self.actions = array('q')
+        self.street = 0
+        self.current_bet = 0
+        self.min_raise = big_blind
+        self.next_seat = 2 % count
+        # Первый ход после флопа: место 0 слева от баттона, в хедз-апе — большой блайнд
+        self.first_seat = 1 if count == 2 else 0
+        self.contenders = count
+
+    @property
+    def pot(self):
+        return sum(self.invested)
+
+    def post_blinds(self, small_blind, ante=0):
+        # Анте — мёртвые фишки в банк: в раздачу вложены, но в ставку улицы не идут
+        if ante:
+            for seat, player in enumerate(self.players):
+                self.apply(seat, ANTE, min(ante, player.stack))
+        for seat, blind in ((0, small_blind), (1 % len(self.players), self.big_blind)):
+            # Блайнд больше стека ставится олл-ином
+            self.apply(seat, POST, min(blind, self.players[seat].stack))
+
+    def start_street(self, street):
+        count = len(self.players)
+        self.street = street
+        self.committed = [0] * count
+        self.acted = [False] * count
+        self.current_bet = 0
+        self.min_raise = self.big_blind
+        self.next_seat = self.first_seat
+
+    def needs_action(self, seat):
+        return not (self.folded[seat] or self.all_in[seat]) and (not self.acted[seat] or self.committed[seat] < self.current_bet)
+
+    def can_act(self, seat):
+        return not (self.folded[seat] or self.all_in[seat])
+
+    def next_to_act(self):
+        """Место, за которым ход, или None, если торговля на улице закончена."""
+        if self.contenders <= 1:
+            return None
+        count = len(self.players)
+        # Единственному не ушедшему в олл-ин, который уже уравнял, торговаться не с кем
+        if sum(map(self.can_act, range(count))) <= 1 and all(
+                self.committed[seat] >= self.current_bet for seat in range(count) if self.can_act(seat)):
+            return None
+        for offset in range(count):
+            seat = (self.next_seat + offset) % count
+            if self.needs_action(seat):
+                return seat
+        return None
+
+    def to_call(self, seat):
+        return min(self.current_bet - self.committed[seat], self.players[seat].stack)
+
+    def act(self, seat, decision):
+        """Решение игрока ('fold', 'call', 'raise') в допустимое действие; возвращает (действие, сумма).
+
+        Сброс без ставки — чек, рейз без права на рейз или без соперников с фишками — колл.
+        Рейз — на половину банка после колла, но не меньше минимального, и не больше стека.
+        """
+        to_call = self.current_bet - self.committed[seat]
+        stack = self.players[seat].stack
+        action = ACTIONS.index(decision)
+        if action == FOLD and to_call <= 0:
+            action = CALL
+        if action == RAISE and (self.acted[seat] or stack <= to_call or not any(
+                self.can_act(other) for other in range(len(self.players)) if other != seat)):
+            action = CALL
+
+        if action == FOLD:
+            amount = 0
+        elif action == CALL:
+            amount = min(to_call, stack)
+        else:
+            amount = min(to_call + max(self.min_raise, (self.pot + to_call) // 2), stack)
+        self.apply(seat, action, amount)
+        return action, amount
+
+    def apply(self, seat, action, amount):
+        self.actions.append(encode_action(seat, self.street, action, amount))
+        player = self.players[seat]
+        if action == FOLD:
+            self.folded[seat] = True
+            self.contenders -= 1
+        else:
+            player.stack -= amount
+            self.invested[seat] += amount
+            if action != ANTE:
+                self.committed[seat] += amount
+            if player.stack == 0:
+                self.all_in[seat] = True
+
+        raised_by = self.committed[seat] - self.current_bet
+        if raised_by > 0:
+            self.current_bet = self.committed[seat]
+            # Полный рейз открывает торговлю заново; неполный олл-ин — нет
+            if raised_by >= self.min_raise:
+                self.min_raise = raised_by
+                self.acted = [False] * len(self.players)
+        if action not in (POST, ANTE):
+            self.acted[seat] = True
+            self.next_seat = (seat + 1) % len(self.players)
+
+    @classmethod
+    def replay(cls, players, big_blind, starting_stacks, actions):
+        """Раздача, восстановленная по журналу (или его началу) со стартовыми стеками.
+
+        Места занимают копии игроков (имя, карты, стек), поэтому проверка журнала — в том
+        числе уже сыгранной раздачи — не трогает настоящие стеки.
+        """
+        seats = [SimpleNamespace(name=player.name, hole_cards=player.hole_cards, stack=stack)
+                 for player, stack in zip(players, starting_stacks)]
+        hand = cls(seats, big_blind)
+        for code in actions:
+            seat, street, action, amount = decode_action(code)
+            if street != hand.street:
+                hand.start_street(street)
+            hand.apply(seat, action, amount)
+        return hand
+
+    def award(self, board):
+        """Раздел основного и побочных банков; возвращает выигрыш по местам и начисляет его в стеки.
+
+        Каждый уровень вложений претендентов — отдельный банк для тех, кто вложил не меньше;
+        равные руки делят банк, лишние фишки достаются ближним к баттону слева.
+        """
+        count = len(self.players)
+        winnings = [0] * count
+        order = [(self.first_seat + offset) % count for offset in range(count)]
+        contenders = [seat for seat in order if not self.folded[seat]]
+        if len(contenders) == 1:
+            winnings[contenders[0]] = self.pot
+        else:
+            strengths = {seat: HandEvaluator.evaluate_hand(self.players[seat].hole_cards + board) for seat in contenders}
+            previous = 0
+            for level in sorted({self.invested[seat] for seat in contenders}):
+                pot = sum(min(invested, level) - min(invested, previous) for invested in self.invested)
+                previous = level
+                eligible = [seat for seat in contenders if self.invested[seat] >= level]
+                best = max(strengths[seat] for seat in eligible)
+                winners = [seat for seat in eligible if strengths[seat] == best]
+                share, odd = divmod(pot, len(winners))
+                for number, seat in enumerate(winners):
+                    winnings[seat] += share + (number < odd)
+            # Вложения сбросивших сверх верхнего уровня претендентов (если есть) — в последний банк
+            winnings[winners[0]] += self.pot - sum(winnings)
+
+        for seat, amount in enumerate(winnings):
+            self.players[seat].stack += amount
+        return winnings
@@ -0,0 +1,251 @@
+import argparse
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from hand_evaluator import HandEvaluator
+
+# Формат файла корзин (little-endian):
+#   заголовок: magic, версия, число префлоп-корзин, число постфлоп-корзин
+#   int16[169]           — корзина каждого из 169 классов стартовых рук
+#   int16[3, NUM_POSTFLOP_KEYS] — корзина по улице (флоп, тёрн, ривер) и постфлоп-ключу руки
+MAGIC = b'HANDBKTS'
+VERSION = 2
+_HEADER = struct.Struct('<8sIII')
+
+BUCKETS_FILE = 'hand_buckets.bin'
+NUM_PREFLOP_CLASSES = 169
+NUM_STRENGTHS = 7463
+POSTFLOP_BOARD_SIZES = [3, 4, 5]
+# Постфлоп-ключ — дро руки вместе с бордом и сила лучшей комбинации: draw * NUM_STRENGTHS + сила.
+# Дро — флеш (нет, бэкдор, флеш-дро) * 3 + стрит (нет, гатшот, двусторонний); на ривере 0.
+NUM_DRAWS = 9
+NUM_POSTFLOP_KEYS = NUM_DRAWS * NUM_STRENGTHS
+
+# Ранги стрита битами (двойка — бит 0, туз — бит 12); колесо A-5 — первым
+_STRAIGHTS = np.array([0b1000000001111] + [0b11111 << low for low in range(9)])
+
+
+def _has_straight(masks):
+    return ((masks[..., None] & _STRAIGHTS) == _STRAIGHTS).any(axis=-1)
+
+
+def _completing_ranks():
+    # Для каждого набора рангов — биты рангов, одна карта которых собирает стрит; у готового стрита их нет
+    masks = np.arange(1 << 13)
+    ranks = np.arange(13)
+    completes = _has_straight(masks[:, None] | 1 << ranks) & ~_has_straight(masks)[:, None]
+    return (completes << ranks).sum(axis=1)
+
+
+_NP_COMPLETING = _completing_ranks()
+_COMPLETING = _NP_COMPLETING.tolist()
+_POPCOUNT = np.array([bin(mask).count('1') for mask in range(1 << 13)], dtype=np.int64)
+
+
+def _preflop_class(card1, card2):
+    high, low = max(card1 >> 2, card2 >> 2), min(card1 >> 2, card2 >> 2)
+    if high == low:
+        return high
+    pair_index = high * (high - 1) // 2 + low
+    return 13 + pair_index if card1 & 3 == card2 & 3 else 91 + pair_index
+
+
+# 13 пар, 78 одномастных и 78 разномастных стартовых рук
+_PREFLOP_CLASSES = np.array([[_preflop_class(a, b) for b in range(52)] for a in range(52)], dtype=np.int16)
+
+
+def postflop_key(hole_cards, board):
+    """Постфлоп-ключ одной руки: одинаковая сила с дро и без него даёт разные ключи."""
+    cards = list(hole_cards) + list(board)
+    strength = HandEvaluator.evaluate_hand(cards)
+    if len(board) == 5:
+        return strength
+    suits = [0] * 4
+    mask = board_mask = 0
+    for card in cards:
+        suits[card & 3] += 1
+        mask |= 1 << (card >> 2)
+    for card in board:
+        board_mask |= 1 << (card >> 2)
+    # Флеш-дро и стрит-дро считаются, только если в них участвует карта руки
+    flush = max(suits[card & 3] for card in hole_cards)
+    flush_draw = 2 if flush == 4 else 1 if flush == 3 and len(board) == 3 else 0
+    outs = bin(_COMPLETING[mask] & ~_COMPLETING[board_mask]).count('1')
+    return (flush_draw * 3 + min(outs, 2)) * NUM_STRENGTHS + strength
+
+
+def postflop_keys(holes, boards):
+    """Векторная версия postflop_key для массивов рук (N, 2) и бордов (N, 3..5)."""
+    holes = np.asarray(holes, dtype=np.int64)
+    boards = np.asarray(boards, dtype=np.int64)
+    cards = np.concatenate([holes, boards], axis=1)
+    strengths = HandEvaluator.evaluate_batch(cards)
+    if boards.shape[1] == 5:
+        return strengths
+    suits = np.arange(4)
+    counts = ((cards[:, :, None] & 3) == suits).sum(axis=1)
+    in_hole = ((holes[:, :, None] & 3) == suits).any(axis=1)
+    flush = np.where(in_hole, counts, 0).max(axis=1)
+    flush_draw = np.where(flush == 4, 2, np.where((flush == 3) & (boards.shape[1] == 3), 1, 0))
+    mask = np.bitwise_or.reduce(1 << (cards >> 2), axis=1)
+    board_mask = np.bitwise_or.reduce(1 << (boards >> 2), axis=1)
+    outs = _POPCOUNT[_NP_COMPLETING[mask] & ~_NP_COMPLETING[board_mask]]
+    return (flush_draw * 3 + np.minimum(outs, 2)) * NUM_STRENGTHS + strengths
+
+
+class BucketTables:
+    """Таблицы корзин: номер корзины — одно обращение к массиву по классу руки или постфлоп-ключу."""
+
+    def __init__(self, preflop, postflop):
+        self.preflop = np.ascontiguousarray(preflop, dtype=np.int16)
+        self.postflop = np.ascontiguousarray(postflop, dtype=np.int16)
+        self.num_preflop_buckets = int(self.preflop.max()) + 1
+        self.num_postflop_buckets = int(self.postflop.max()) + 1
+        # Корзина по двум картам сразу, без промежуточного класса
+        self.hole = self.preflop[_PREFLOP_CLASSES]
+        # Отпечаток таблиц: его хранит файл стратегии, обученной на этих корзинах
+        self.checksum = zlib.crc32(self.postflop.astype('<i2').tobytes(), zlib.crc32(self.preflop.astype('<i2').tobytes()))
+
+    @classmethod
+    def default(cls):
+        # Без файла: каждый класс стартовой руки — своя корзина, постфлоп — категория комбинации
+        # и сила дро (нет; бэкдор или гатшот; флеш-дро или двусторонний)
+        keys = np.arange(NUM_POSTFLOP_KEYS)
+        draws = keys // NUM_STRENGTHS
+        postflop = HandEvaluator.hand_category(keys % NUM_STRENGTHS) * 3 + np.maximum(draws // 3, draws % 3)
+        return cls(np.arange(NUM_PREFLOP_CLASSES), np.tile(postflop, (len(POSTFLOP_BOARD_SIZES), 1)))
+
+    @classmethod
+    def load(cls, file_name=BUCKETS_FILE):
+        with open(file_name, 'rb') as f:
+            magic, version, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{file_name}: не файл корзин")
+            if version != VERSION:
+                raise ValueError(f"{file_name}: неподдерживаемая версия формата {version}")
+            preflop = np.fromfile(f, dtype='<i2', count=NUM_PREFLOP_CLASSES)
+            postflop = np.fromfile(f, dtype='<i2', count=len(POSTFLOP_BOARD_SIZES) * NUM_POSTFLOP_KEYS)
+        return cls(preflop, postflop.reshape(len(POSTFLOP_BOARD_SIZES), NUM_POSTFLOP_KEYS))
+
+    @classmethod
+    def load_default(cls):
+        return cls.load(BUCKETS_FILE) if os.path.exists(BUCKETS_FILE) else cls.default()
+
+    def save(self, file_name=BUCKETS_FILE):
+        temp_name = f"{file_name}.tmp"
+        with open(temp_name, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.num_preflop_buckets, self.num_postflop_buckets))
+            f.write(self.preflop.astype('<i2').tobytes())
+            f.write(self.postflop.astype('<i2').tobytes())
+        os.replace(temp_name, file_name)
+
+
+def _equity_features(rng, num_samples, board_size, runouts=8, opponents=8, chunk=2048):
+    """Случайные руки с бордом board_size и их признаки: ключ руки, E[HS] и E[HS²].
+
+    Ключ — класс стартовой руки префлоп и postflop_key дальше. HS — эквити против
+    случайной руки при одном добазаре; разброс HS по добазарам (E[HS²]) отличает дро
+    от готовых рук с тем же средним эквити.
+    """
+    missing = 5 - board_size
+    if not missing:
+        runouts, opponents = 1, runouts * opponents
+    opponents = min(opponents, (50 - board_size - missing) // 2)
+    keys, equity, equity_squared = [], [], []
+    for start in range(0, num_samples, chunk):
+        n = min(chunk, num_samples - start)
+        deals = np.argsort(rng.random((n, 52)), axis=1)
+        hole, board, rest = deals[:, :2], deals[:, 2:2 + board_size], deals[:, 2 + board_size:]
+        if board_size:
+            keys.append(postflop_keys(hole, board))
+        else:
+            keys.append(np.stack([hole[:, 0], hole[:, 1]], axis=1))
+
+        order = np.argsort(rng.random((n, runouts, rest.shape[1])), axis=2)
+        rest = np.take_along_axis(np.broadcast_to(rest[:, None, :], order.shape), order, axis=2)
+        full_board = np.concatenate([np.broadcast_to(board[:, None, :], (n, runouts, board_size)), rest[:, :, :missing]], axis=2)
+        hero = HandEvaluator.evaluate_batch(np.concatenate(
+            [np.broadcast_to(hole[:, None, :], (n, runouts, 2)), full_board], axis=2).reshape(-1, 7)).reshape(n, runouts, 1)
+
+        villain_holes = rest[:, :, missing:missing + 2 * opponents].reshape(n, runouts, opponents, 2)
+        villain = HandEvaluator.evaluate_batch(np.concatenate(
+            [villain_holes, np.broadcast_to(full_board[:, :, None, :], (n, runouts, opponents, 5))], axis=3).reshape(-1, 7))
+        outcome = (np.sign(hero - villain.reshape(n, runouts, opponents)) + 1) / 2
+        strength = outcome.mean(axis=2)
+        equity.append(strength.mean(axis=1))
+        equity_squared.append((strength ** 2).mean(axis=1))
+    return np.concatenate(keys), np.concatenate(equity), np.concatenate(equity_squared)
+
+
+def _kmeans(points, weights, k, iterations=50):
+    """Взвешенные k-средних; корзины нумеруются по возрастанию среднего эквити."""
+    if len(points) <= k:
+        return np.argsort(np.argsort(points[:, 0]))
+    order = np.argsort(points[:, 0])
+    cumulative = np.cumsum(weights[order])
+    # Начальные центры — квантили эквити
+    starts = np.searchsorted(cumulative, (np.arange(k) + 0.5) / k * cumulative[-1])
+    centers = points[order[np.minimum(starts, len(order) - 1)]].copy()
+    for _ in range(iterations):
+        labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        mass = np.bincount(labels, weights, minlength=k)
+        updated = np.stack([np.bincount(labels, weights * points[:, d], minlength=k) for d in range(points.shape[1])], axis=1)
+        filled = mass > 0
+        updated[filled] /= mass[filled, None]
+        updated[~filled] = centers[~filled]
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+    labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    rank = np.empty(k, dtype=np.int64)
+    rank[np.argsort(centers[:, 0])] = np.arange(k)
+    return np.unique(rank[labels], return_inverse=True)[1]
+
+
+def _cluster(keys, equity, equity_squared, num_keys, k):
+    """Корзина для каждого ключа 0..num_keys-1; невстреченный ключ — как у ближайшего встреченного."""
+    keys = keys.astype(np.int64)
+    counts = np.bincount(keys, minlength=num_keys)
+    seen = np.flatnonzero(counts)
+    points = np.stack([np.bincount(keys, equity, minlength=num_keys)[seen],
+                       np.bincount(keys, equity_squared, minlength=num_keys)[seen]], axis=1) / counts[seen, None]
+    labels = _kmeans(points, counts[seen].astype(np.float64), k)
+    above = np.clip(np.searchsorted(seen, np.arange(num_keys)), 1, len(seen) - 1)
+    below = above - 1
+    nearest = np.where(np.abs(seen[above] - np.arange(num_keys)) < np.abs(np.arange(num_keys) - seen[below]), above, below)
+    return labels[nearest] if len(seen) > 1 else np.zeros(num_keys, dtype=np.int64)
+
+
+def compute_buckets(preflop_buckets=NUM_PREFLOP_CLASSES, postflop_buckets=16, samples=100000, seed=None):
+    """Офлайн-расчёт корзин: классы стартовых рук и постфлоп-ключи кластеризуются по эквити."""
+    rng = np.random.default_rng(seed)
+
+    preflop = np.arange(NUM_PREFLOP_CLASSES)
+    if preflop_buckets < NUM_PREFLOP_CLASSES:
+        holes, equity, equity_squared = _equity_features(rng, samples, 0)
+        classes = _PREFLOP_CLASSES[holes[:, 0], holes[:, 1]].astype(np.int64)
+        preflop = _cluster(classes, equity, equity_squared, NUM_PREFLOP_CLASSES, preflop_buckets)
+
+    postflop = np.stack([_cluster(*_equity_features(rng, samples, board_size), NUM_POSTFLOP_KEYS, postflop_buckets)
+                         for board_size in POSTFLOP_BOARD_SIZES])
+    return BucketTables(preflop, postflop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Предрасчёт корзин рук для абстракции MCCFR")
+    parser.add_argument('--preflop-buckets', type=int, default=NUM_PREFLOP_CLASSES)
+    parser.add_argument('--postflop-buckets', type=int, default=16)
+    parser.add_argument('--samples', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=BUCKETS_FILE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    tables = compute_buckets(args.preflop_buckets, args.postflop_buckets, args.samples, args.seed)
+    tables.save(args.output)
+    print(f"Корзины сохранены в {args.output}: {tables.num_preflop_buckets} префлоп, "
+          f"{tables.num_postflop_buckets} постфлоп на улицу, {time.perf_counter() - started:.1f} с")
@@ -0,0 +1,45 @@
+# Карта — целое 0..51: ранг (0 = двойка .. 12 = туз) * 4 + масть.
+# В строку ('AS', '10H') карты переводятся только на границе с вебом и логами.
+RANK_LABELS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+SUIT_LABELS = ['H', 'D', 'C', 'S']
+
+FULL_DECK = tuple(range(52))
+
+_CARD_STRINGS = [RANK_LABELS[card >> 2] + SUIT_LABELS[card & 3] for card in FULL_DECK]
+_STRING_CARDS = {text: card for card, text in enumerate(_CARD_STRINGS)}
+
+
+def make_card(rank, suit):
+    return rank * 4 + suit
+
+
+def card_rank(card):
+    return card >> 2
+
+
+def card_suit(card):
+    return card & 3
+
+
+def card_to_str(card):
+    return _CARD_STRINGS[card]
+
+
+def cards_to_str(cards):
+    return [_CARD_STRINGS[card] for card in cards]
+
+
+def card_from_str(text):
+    try:
+        return _STRING_CARDS[text.upper()]
+    except KeyError:
+        raise ValueError(f"Некорректная карта: {text}")
+
+
+def pack_cards(cards):
+    """Байт на карту — компактно для BLOB-колонок базы."""
+    return bytes(cards)
+
+
+def unpack_cards(blob):
+    return list(blob)
@@ -1,38 +1,79 @@
+import json
+import os
+from types import MappingProxyType
+
+from icm import ICMCalculator
+
+CONFIG_FILE = 'tournament_config.json'
+
+_DEFAULTS = {
+    'round_duration_minutes': 6,
+    'starting_stack': 10000,
+    'players_per_table': 8,
+    'mccfr_iterations': 1000,
+    'levels': [
+        {'small_blind': 50, 'big_blind': 100, 'ante': 10},
+        {'small_blind': 100, 'big_blind': 200, 'ante': 20},
+    ],
+    'level_growth': 2,
+    'max_levels': 64,
+    'payout_structure': [0.5, 0.3, 0.2],
+}
+
+
 class PokerTournamentConfig:
-    def __init__(self):
-        self.round_duration_minutes = 6
-        self.initial_blinds_structure = {
-            1: {'small_blind': 50, 'big_blind': 100, 'ante': 10},
-            2: {'small_blind': 100, 'big_blind': 200, 'ante': 20},
-            # ... (остальные раунды)
-        }
-        self.blinds_structure = self.initial_blinds_structure.copy()
-        self.starting_stack = 10000
-        self.payout_structure = {1: 0.5, 2: 0.3, 3: 0.2}
-        self.additional_rounds = 0
+    """Параметры турнира из tournament_config.json (или встроенные по умолчанию).
+
+    Расписание блайндов считается один раз при загрузке и дальше не меняется: уровни
+    из файла, затем каждый следующий в level_growth раз больше, до max_levels; после
+    последнего уровня блайнды остаются прежними.
+    """
+
+    def __init__(self, file_name=CONFIG_FILE):
+        settings = dict(_DEFAULTS)
+        if file_name and os.path.exists(file_name):
+            with open(file_name) as f:
+                settings.update(json.load(f))
+
+        self.round_duration_minutes = settings['round_duration_minutes']
+        self.starting_stack = settings['starting_stack']
+        self.players_per_table = settings['players_per_table']
+        self.mccfr_iterations = settings['mccfr_iterations']
+        self.payout_structure = MappingProxyType({place: share for place, share in enumerate(settings['payout_structure'], 1)})
+        self.blinds_structure = self.build_schedule(settings['levels'], settings['level_growth'], settings['max_levels'])
+        self.validate_configuration()
+
+    @staticmethod
+    def build_schedule(levels, growth, max_levels):
+        schedule = [dict(level) for level in levels]
+        while len(schedule) < max_levels:
+            schedule.append({key: int(value * growth) for key, value in schedule[-1].items()})
+        return tuple(MappingProxyType(level) for level in schedule)
 
     def get_blinds_for_round(self, round_number):
-        if round_number in self.blinds_structure:
-            return self.blinds_structure[round_number]
-        
-        last_round = max(self.blinds_structure.keys())
-        if round_number > last_round:
-            self.additional_rounds += 1
-            new_blinds = {key: value * 2 for key, value in self.blinds_structure[last_round].items()}
-            self.blinds_structure[round_number] = new_blinds
-            return new_blinds
-        else:
+        if round_number < 1:
             raise ValueError(f"Round {round_number} out of range!")
+        return self.blinds_structure[min(round_number, len(self.blinds_structure)) - 1]
 
     def get_payouts(self, prize_pool):
         return {position: prize_pool * percentage for position, percentage in self.payout_structure.items()}
 
+    def icm(self, prize_pool=1.0):
+        """ICM для призовых этого турнира: ожидаемый выигрыш по стекам оставшихся игроков."""
+        return ICMCalculator(list(self.get_payouts(prize_pool).values()))
+
     def validate_configuration(self):
-        if not isinstance(self.blinds_structure, dict) or not self.blinds_structure:
+        if not self.blinds_structure:
             raise ValueError("Некорректная структура блайндов")
+        if any(level['small_blind'] > level['big_blind'] for level in self.blinds_structure):
+            raise ValueError("Малый блайнд больше большого")
         if not isinstance(self.starting_stack, int) or self.starting_stack <= 0:
             raise ValueError("Начальный стек должен быть положительным целым числом")
+        if abs(sum(self.payout_structure.values()) - 1) > 1e-9:
+            raise ValueError("Доли призовых должны давать в сумме 1")
 
     def dynamic_adjustment(self, current_round):
+        """Число итераций дообучения MCCFR для круга: после пятого на 50% больше."""
         if current_round > 5:
-            self.mccfr_iterations = int(self.mccfr_iterations * 1.5)  # Увеличением итераций на 50%
+            return int(self.mccfr_iterations * 1.5)
+        return self.mccfr_iterations
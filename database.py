@@ -1,9 +1,21 @@
+import queue
 import sqlite3
-import pickle
+import threading
+import time
+from cards import pack_cards
+from logging_system import get_logger
+
+# Индексы из abstraction.ACTIONS и abstraction.STREETS, как они хранятся в таблице actions
+# (действия 3 и 4 — блайнд и анте, betting.POST и betting.ANTE)
+CALL, RAISE = 1, 2
+PREFLOP = 0
 
 class TournamentDatabase:
     def __init__(self, db_name="tournament_results.db"):
+        self.db_name = db_name
         self.conn = sqlite3.connect(db_name)
+        # WAL: фоновый писатель истории раздач не блокирует чтение статистики
+        self.conn.execute('PRAGMA journal_mode=WAL')
         self.create_tables()
 
     def create_tables(self):
@@ -27,18 +39,242 @@ class TournamentDatabase:
                 pot INTEGER NOT NULL,
                 community_cards BLOB
             )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS tournament_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                num_players INTEGER NOT NULL
+            )''')
+            # История раздач: карты — по байту на карту, улица и действие — индексы STREETS и ACTIONS
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS hands (
+                id INTEGER PRIMARY KEY,
+                tournament_id INTEGER NOT NULL,
+                round INTEGER NOT NULL,
+                table_id INTEGER NOT NULL,
+                board BLOB,
+                pot INTEGER NOT NULL,
+                FOREIGN KEY (tournament_id) REFERENCES tournament_runs(id)
+            )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS actions (
+                hand_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                player TEXT NOT NULL,
+                stage INTEGER NOT NULL,
+                action INTEGER NOT NULL,
+                amount INTEGER NOT NULL,
+                FOREIGN KEY (hand_id) REFERENCES hands(id)
+            )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS showdowns (
+                hand_id INTEGER NOT NULL,
+                player TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                hole_cards BLOB,
+                strength INTEGER NOT NULL,
+                invested INTEGER NOT NULL,
+                winnings INTEGER NOT NULL,
+                FOREIGN KEY (hand_id) REFERENCES hands(id)
+            )''')
+            # Агрегаты по игрокам: обновляются писателем истории в той же транзакции, что и раздачи
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS player_stats (
+                player TEXT PRIMARY KEY,
+                hands INTEGER NOT NULL,
+                vpip INTEGER NOT NULL,
+                pfr INTEGER NOT NULL,
+                raises INTEGER NOT NULL,
+                calls INTEGER NOT NULL,
+                wins INTEGER NOT NULL,
+                profit INTEGER NOT NULL
+            )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS player_position_stats (
+                player TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                hands INTEGER NOT NULL,
+                profit INTEGER NOT NULL,
+                PRIMARY KEY (player, position)
+            )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS player_stage_stats (
+                player TEXT NOT NULL,
+                stage INTEGER NOT NULL,
+                hands INTEGER NOT NULL,
+                profit INTEGER NOT NULL,
+                PRIMARY KEY (player, stage)
+            )''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_hands_tournament ON hands(tournament_id)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_hand ON actions(hand_id)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_player ON actions(player)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_showdowns_hand ON showdowns(hand_id)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_showdowns_player ON showdowns(player)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_players_name ON players(name)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_player_stats_profit ON player_stats(profit)')
+
+    def start_tournament(self, num_players):
+        with self.conn:
+            cur = self.conn.execute('INSERT INTO tournament_runs (started_at, num_players) VALUES (?, ?)',
+                                    (time.time(), num_players))
+            return cur.lastrowid
+
+    def hand_writer(self, tournament_id, batch_size=2000, flush_interval=1.0):
+        return HandHistoryWriter(self.db_name, tournament_id, batch_size, flush_interval)
 
     def save_player(self, player):
         with self.conn:
-            hole_cards_blob = pickle.dumps(player.hole_cards)
+            hole_cards_blob = pack_cards(player.hole_cards)
             cur = self.conn.execute('''INSERT INTO players (name, stack, hole_cards) 
                                        VALUES (?, ?, ?)''', (player.name, player.stack, hole_cards_blob))
             return cur.lastrowid
 
     def fetch_player_stats(self, player_name):
-        with self.conn:
-            player_stats = self.conn.execute('SELECT * FROM players WHERE name=?', (player_name,)).fetchall()
-        return player_stats if player_stats else None
+        """Сводка по игроку из агрегатов: проценты VPIP/PFR, фактор агрессии, прибыль по позициям и улицам."""
+        row = self.conn.execute('SELECT * FROM player_stats WHERE player=?', (player_name,)).fetchone()
+        if row is None:
+            return None
+        stats = self._summarize(row)
+        stats['by_position'] = {
+            position: {'hands': hands, 'profit': profit}
+            for position, hands, profit in self.conn.execute(
+                'SELECT position, hands, profit FROM player_position_stats WHERE player=? ORDER BY position', (player_name,))
+        }
+        stats['by_stage'] = {
+            stage: {'hands': hands, 'profit': profit}
+            for stage, hands, profit in self.conn.execute(
+                'SELECT stage, hands, profit FROM player_stage_stats WHERE player=? ORDER BY stage', (player_name,))
+        }
+        return stats
+
+    def leaderboard(self, limit=10):
+        rows = self.conn.execute('SELECT * FROM player_stats ORDER BY profit DESC LIMIT ?', (limit,)).fetchall()
+        return [self._summarize(row) for row in rows]
+
+    @staticmethod
+    def _summarize(row):
+        player, hands, vpip, pfr, raises, calls, wins, profit = row
+        return {
+            'player': player,
+            'hands': hands,
+            'vpip': vpip / hands if hands else 0.0,
+            'pfr': pfr / hands if hands else 0.0,
+            'aggression_factor': raises / calls if calls else float(raises),
+            'win_rate': wins / hands if hands else 0.0,
+            'profit': profit,
+        }
 
     def close(self):
         self.conn.close()
+
+
+class HandHistoryWriter:
+    """Фоновая запись истории раздач.
+
+    record_hand только дописывает кортеж в локальный буфер; пачки раздач уходят через
+    очередь потоку-писателю со своим соединением, который пишет каждую пачку через
+    executemany одной транзакцией.
+    """
+
+    def __init__(self, db_name, tournament_id, batch_size=2000, flush_interval=1.0):
+        self.tournament_id = tournament_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(db_name,), daemon=True)
+        self.thread.start()
+
+    def record_hand(self, round_number, table_id, board, pot, actions, showdowns):
+        """actions — (игрок, улица, действие, сумма);
+        showdowns — (игрок, позиция от баттона, карты, сила, вложено, выигрыш)."""
+        self.buffer.append((round_number, table_id, board, pot, actions, showdowns))
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.queue.put(self.buffer)
+            self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self, db_name):
+        conn = sqlite3.connect(db_name)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            try:
+                self._write(conn, batch)
+            except Exception:
+                # Пачка теряется, но поток продолжает разбирать очередь — иначе она растёт без предела
+                get_logger().log_error("Не удалось записать в историю %s раздач", len(batch))
+        conn.close()
+
+    def _write(self, conn, batch):
+        with conn:
+            # Номера раздач резервируются под замком записи: другой писатель в ту же базу
+            # (второй турнир) не возьмёт те же номера между SELECT и INSERT
+            conn.execute('BEGIN IMMEDIATE')
+            next_id = (conn.execute('SELECT MAX(id) FROM hands').fetchone()[0] or 0) + 1
+            hands, actions, showdowns = [], [], []
+            stats, position_stats, stage_stats = {}, {}, {}
+            for hand_id, (round_number, table_id, board, pot, hand_actions, hand_showdowns) in enumerate(batch, next_id):
+                hands.append((hand_id, self.tournament_id, round_number, table_id, pack_cards(board), pot))
+                actions.extend((hand_id, seq) + action for seq, action in enumerate(hand_actions))
+                showdowns.extend((hand_id, player, position, pack_cards(hole_cards), strength, invested, winnings)
+                                 for player, position, hole_cards, strength, invested, winnings in hand_showdowns)
+                # Улица, до которой дошла раздача: по числу карт борда (0, 3, 4, 5)
+                reached = max(len(board) - 2, PREFLOP)
+                self._aggregate(hand_actions, hand_showdowns, reached, stats, position_stats, stage_stats)
+
+            conn.executemany('INSERT INTO hands VALUES (?, ?, ?, ?, ?, ?)', hands)
+            conn.executemany('INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?)', actions)
+            conn.executemany('INSERT INTO showdowns VALUES (?, ?, ?, ?, ?, ?, ?)', showdowns)
+            conn.executemany('''INSERT INTO player_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(player) DO UPDATE SET hands = hands + excluded.hands, vpip = vpip + excluded.vpip,
+                pfr = pfr + excluded.pfr, raises = raises + excluded.raises, calls = calls + excluded.calls,
+                wins = wins + excluded.wins, profit = profit + excluded.profit''',
+                [(player,) + tuple(values) for player, values in stats.items()])
+            conn.executemany('''INSERT INTO player_position_stats VALUES (?, ?, ?, ?)
+                ON CONFLICT(player, position) DO UPDATE SET hands = hands + excluded.hands, profit = profit + excluded.profit''',
+                [key + tuple(values) for key, values in position_stats.items()])
+            conn.executemany('''INSERT INTO player_stage_stats VALUES (?, ?, ?, ?)
+                ON CONFLICT(player, stage) DO UPDATE SET hands = hands + excluded.hands, profit = profit + excluded.profit''',
+                [key + tuple(values) for key, values in stage_stats.items()])
+
+    @staticmethod
+    def _aggregate(hand_actions, hand_showdowns, reached, stats, position_stats, stage_stats):
+        """Приращения агрегатов за одну раздачу; складываются в словари пачки.
+
+        reached — последняя улица раздачи: на ней заканчивают все, кто не сбросил карты.
+        Выигранной считается раздача с прибылью, а не любой возврат фишек из банка.
+        """
+        voluntary, raised, last_stage = set(), set(), {}
+        counters = {}
+        for player, stage, action, amount in hand_actions:
+            player_counters = counters.setdefault(player, [0, 0])
+            # Колл без фишек — чек: не колл для фактора агрессии и не добровольный вход в банк
+            if action == RAISE:
+                player_counters[0] += 1
+            elif action == CALL and amount:
+                player_counters[1] += 1
+            if stage == PREFLOP and action in (CALL, RAISE) and amount:
+                voluntary.add(player)
+                if action == RAISE:
+                    raised.add(player)
+            if action == 0 and player not in last_stage:  # fold: дальше игрок в раздаче не участвует
+                last_stage[player] = stage
+
+        for player, position, hole_cards, strength, invested, winnings in hand_showdowns:
+            profit = winnings - invested
+            raises, calls = counters.get(player, (0, 0))
+            totals = stats.setdefault(player, [0] * 7)
+            for i, value in enumerate((1, player in voluntary, player in raised, raises, calls, profit > 0, profit)):
+                totals[i] += value
+            for key, table in (((player, position), position_stats), ((player, last_stage.get(player, reached)), stage_stats)):
+                totals = table.setdefault(key, [0, 0])
+                totals[0] += 1
+                totals[1] += profit
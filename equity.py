@@ -0,0 +1,122 @@
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from cards import FULL_DECK
+from hand_evaluator import HandEvaluator
+
+
+class EquityCalculator:
+    """Эквити руки против случайных рук, конкретной руки или диапазона.
+
+    Если полный перебор раскладов укладывается в exact_limit строк (тёрн и ривер,
+    рука против руки на флопе), эквити считается точно; иначе — методом Монте-Карло,
+    все розыгрыши борда одним массивом через HandEvaluator.evaluate_batch.
+    """
+
+    def __init__(self, samples=1000, exact_limit=100000, max_rows=200000, seed=None):
+        self.samples = samples
+        self.exact_limit = exact_limit
+        self.max_rows = max_rows
+        self.rng = np.random.default_rng(seed)
+
+    def equity(self, hole_cards, board=(), num_opponents=1):
+        return float(self.batch_equity([(hole_cards, board)], num_opponents)[0])
+
+    def batch_equity(self, queries, num_opponents=1):
+        """queries — список пар (карты на руках, борд); возвращает массив эквити по порядку."""
+        result = np.empty(len(queries))
+        by_board_size = {}
+        for i, (hole_cards, board) in enumerate(queries):
+            remaining = 50 - len(board)
+            missing = 5 - len(board)
+            if num_opponents == 1 and comb(remaining, missing) * comb(remaining - missing, 2) <= self.exact_limit:
+                result[i] = self._exact(hole_cards, board)
+            else:
+                by_board_size.setdefault(len(board), []).append(i)
+
+        for board_size, indices in by_board_size.items():
+            holes = np.array([queries[i][0] for i in indices], dtype=np.int64).reshape(-1, 2)
+            boards = np.array([queries[i][1] for i in indices], dtype=np.int64).reshape(len(indices), board_size)
+            chunk = max(1, self.max_rows // (self.samples * num_opponents))
+            for start in range(0, len(indices), chunk):
+                stop = start + chunk
+                result[indices[start:stop]] = self._monte_carlo(holes[start:stop], boards[start:stop], num_opponents)
+        return result
+
+    def hand_vs_hand(self, hand1, hand2, board=()):
+        return self.hand_vs_range(hand1, [hand2], board)
+
+    def hand_vs_range(self, hole_cards, villain_range, board=()):
+        """Эквити против диапазона — списка конкретных рук с равными весами."""
+        dead = set(hole_cards) | set(board)
+        villains = np.array([hand for hand in villain_range if not dead & set(hand)], dtype=np.int64).reshape(-1, 2)
+        if not len(villains):
+            raise ValueError("Все руки диапазона заблокированы известными картами")
+
+        missing = 5 - len(board)
+        if len(villains) * comb(48 - len(board), missing) <= self.exact_limit:
+            return self._exact(hole_cards, board, villains)
+        return self._monte_carlo_vs_range(hole_cards, board, villains)
+
+    def _exact(self, hole_cards, board, villains=None):
+        dead = set(hole_cards) | set(board)
+        rest = [card for card in FULL_DECK if card not in dead]
+        missing = 5 - len(board)
+        runouts = np.array(list(combinations(rest, missing)), dtype=np.int64).reshape(comb(len(rest), missing), missing)
+        if villains is None:
+            villains = np.array(list(combinations(rest, 2)), dtype=np.int64)
+
+        runout_index = np.repeat(np.arange(len(runouts)), len(villains))
+        villain_index = np.tile(np.arange(len(villains)), len(runouts))
+        runouts, villains = runouts[runout_index], villains[villain_index]
+        valid = ~(runouts[:, :, None] == villains[:, None, :]).any(axis=(1, 2))
+        runouts, villains = runouts[valid], villains[valid]
+
+        boards = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int64), (len(runouts), len(board))), runouts], axis=1)
+        hero = HandEvaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.array(hole_cards), (len(boards), 2)), boards], axis=1))
+        villain = HandEvaluator.evaluate_batch(np.concatenate([villains, boards], axis=1))
+        return float(self._share(hero, villain[:, None]).mean())
+
+    def _monte_carlo(self, holes, boards, num_opponents):
+        queries, board_size = boards.shape
+        missing = 5 - board_size
+        dead = np.zeros((queries, 52), dtype=bool)
+        rows = np.arange(queries)[:, None]
+        dead[rows, holes] = True
+        dead[rows, boards] = True
+
+        drawn = self._draw(np.repeat(dead, self.samples, axis=0), missing + 2 * num_opponents)
+        full_boards = np.concatenate([np.repeat(boards, self.samples, axis=0), drawn[:, :missing]], axis=1)
+        hero = HandEvaluator.evaluate_batch(np.concatenate([np.repeat(holes, self.samples, axis=0), full_boards], axis=1))
+        opponents = np.stack([
+            HandEvaluator.evaluate_batch(np.concatenate([drawn[:, missing + 2 * j:missing + 2 * j + 2], full_boards], axis=1))
+            for j in range(num_opponents)
+        ], axis=1)
+        return self._share(hero, opponents).reshape(queries, self.samples).mean(axis=1)
+
+    def _monte_carlo_vs_range(self, hole_cards, board, villains):
+        missing = 5 - len(board)
+        villains = villains[self.rng.integers(len(villains), size=self.samples)]
+        dead = np.zeros((self.samples, 52), dtype=bool)
+        dead[:, list(hole_cards) + list(board)] = True
+        dead[np.arange(self.samples)[:, None], villains] = True
+
+        boards = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int64), (self.samples, len(board))), self._draw(dead, missing)], axis=1)
+        hero = HandEvaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.array(hole_cards), (self.samples, 2)), boards], axis=1))
+        villain = HandEvaluator.evaluate_batch(np.concatenate([villains, boards], axis=1))
+        return float(self._share(hero, villain[:, None]).mean())
+
+    def _draw(self, dead, count):
+        # Случайная перестановка оставшихся карт в каждой строке: мёртвые карты уходят в конец
+        keys = self.rng.random(dead.shape)
+        keys[dead] = 2.0
+        return np.argsort(keys, axis=1)[:, :count]
+
+    @staticmethod
+    def _share(hero, opponents):
+        # Доля банка героя: 1 за победу, 1/(k+1) при дележе с k соперниками
+        best = opponents.max(axis=1)
+        ties = (opponents == hero[:, None]).sum(axis=1)
+        return np.where(hero > best, 1.0, np.where(hero == best, 1.0 / (1 + ties), 0.0))
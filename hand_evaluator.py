@@ -1,79 +1,150 @@
-from collections import Counter
+from itertools import combinations_with_replacement
+import numpy as np
+
+HAND_RANKINGS = [
+    'High Card', 'One Pair', 'Two Pair', 'Three of a Kind', 'Straight',
+    'Flush', 'Full House', 'Four of a Kind', 'Straight Flush'
+]
+
+# Ключ ранга — разряд в пятеричной записи: сумма ключей однозначно задаёт мультимножество рангов.
+_POWERS_OF_FIVE = [5 ** r for r in range(13)]
+_RANK_KEY = [_POWERS_OF_FIVE[card >> 2] for card in range(52)]
+_RANK_BIT = [1 << (card >> 2) for card in range(52)]
+# По три бита на масть: до 7 карт одной масти.
+_SUIT_KEY = [1 << (3 * (card & 3)) for card in range(52)]
+
+
+def _encode(category, ranks):
+    value = category
+    for i in range(5):
+        value = (value << 4) | (ranks[i] if i < len(ranks) else 0)
+    return value
+
+
+def _straight_high(mask):
+    for high in range(12, 3, -1):
+        if (mask >> (high - 4)) & 0x1F == 0x1F:
+            return high
+    if mask & 0x100F == 0x100F:  # A-2-3-4-5
+        return 3
+    return -1
+
+
+def _flush_strength(mask):
+    high = _straight_high(mask)
+    if high >= 0:
+        return _encode(8, [high])
+    return _encode(5, [r for r in range(12, -1, -1) if mask >> r & 1][:5])
+
+
+def _rank_strength(counts):
+    present = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in present if counts[r] == 4]
+    trips = [r for r in present if counts[r] == 3]
+    pairs = [r for r in present if counts[r] == 2]
+
+    if quads:
+        return _encode(7, [quads[0], next(r for r in present if r != quads[0])])
+    if trips and (len(trips) > 1 or pairs):
+        return _encode(6, [trips[0], max(trips[1:] + pairs)])
+
+    high = _straight_high(sum(1 << r for r in present))
+    if high >= 0:
+        return _encode(4, [high])
+    if trips:
+        return _encode(3, [trips[0]] + [r for r in present if r != trips[0]][:2])
+    if len(pairs) >= 2:
+        return _encode(2, pairs[:2] + [r for r in present if r not in pairs[:2]][:1])
+    if pairs:
+        return _encode(1, [pairs[0]] + [r for r in present if r != pairs[0]][:3])
+    return _encode(0, present[:5])
+
+
+def _build_tables():
+    rank_table = {}
+    for num_cards in (5, 6, 7):
+        for ranks in combinations_with_replacement(range(13), num_cards):
+            counts = [0] * 13
+            for r in ranks:
+                counts[r] += 1
+            if max(counts) <= 4:
+                rank_table[sum(_POWERS_OF_FIVE[r] for r in ranks)] = _rank_strength(counts)
+
+    flush_table = [0] * (1 << 13)
+    for mask in range(1 << 13):
+        if bin(mask).count('1') >= 5:
+            flush_table[mask] = _flush_strength(mask)
+
+    # Сжимаем закодированные значения в плотные ранги 1..7462 (как у Cactus Kev).
+    distinct = sorted(set(rank_table.values()) | set(v for v in flush_table if v))
+    dense = {value: i + 1 for i, value in enumerate(distinct)}
+    categories = [0] + [value >> 20 for value in distinct]
+
+    rank_table = {key: dense[value] for key, value in rank_table.items()}
+    flush_table = [dense[v] if v else 0 for v in flush_table]
+    return rank_table, flush_table, categories
+
+
+_RANK_TABLE, _FLUSH_TABLE, _CATEGORIES = _build_tables()
+_FLUSH_SUIT = [next((s for s in range(4) if (key >> (3 * s)) & 7 >= 5), -1) for key in range(1 << 12)]
+
+# Те же таблицы в виде массивов для пакетной оценки: ключи рангов отсортированы под searchsorted.
+_NP_RANK_KEY = np.array(_RANK_KEY, dtype=np.int64)
+_NP_RANK_BIT = np.array(_RANK_BIT, dtype=np.int32)
+_NP_SUIT_KEY = np.array(_SUIT_KEY, dtype=np.int32)
+_NP_FLUSH_SUIT = np.array(_FLUSH_SUIT, dtype=np.int8)
+_NP_FLUSH_TABLE = np.array(_FLUSH_TABLE, dtype=np.int16)
+_NP_CATEGORIES = np.array(_CATEGORIES, dtype=np.int8)
+_NP_TABLE_KEYS = np.array(sorted(_RANK_TABLE), dtype=np.int64)
+_NP_TABLE_VALUES = np.array([_RANK_TABLE[key] for key in _NP_TABLE_KEYS.tolist()], dtype=np.int16)
+
 
 class HandEvaluator:
     @staticmethod
-    def evaluate_hand(hand):
-        values = sorted([HandEvaluator.rank_to_value(card[0]) for card in hand], reverse=True)
-        is_flush = len(set(suit for _, suit in hand)) == 1
-        is_straight = HandEvaluator.is_straight(values)
-
-        if is_flush and is_straight:
-            return "Straight Flush", values
-        elif HandEvaluator.is_four_of_a_kind(values):
-            return "Four of a Kind", values
-        elif HandEvaluator.is_full_house(values):
-            return "Full House", values
-        elif is_flush:
-            return "Flush", values
-        elif is_straight:
-            return "Straight", values
-        elif HandEvaluator.is_three_of_a_kind(values):
-            return "Three of a Kind", values
-        elif HandEvaluator.is_two_pair(values):
-            return "Two Pair", values
-        elif HandEvaluator.is_one_pair(values):
-            return "One Pair", values
-        else:
-            return "High Card", values
+    def evaluate_hand(cards):
+        """Сила лучшей пятикарточной комбинации из 5-7 карт (см. cards.py); больше — сильнее."""
+        key = 0
+        suits = 0
+        for card in cards:
+            key += _RANK_KEY[card]
+            suits += _SUIT_KEY[card]
 
-    @staticmethod
-    def compare_hands(hand1, hand2):
-        score1, high_card1 = HandEvaluator.evaluate_hand(hand1)
-        score2, high_card2 = HandEvaluator.evaluate_hand(hand2)
-
-        hand_rankings = [
-            'High Card', 'One Pair', 'Two Pair', 'Three of a Kind', 'Straight',
-            'Flush', 'Full House', 'Four of a Kind', 'Straight Flush'
-        ]
-
-        if hand_rankings.index(score1) > hand_rankings.index(score2):
-            return 1
-        elif hand_rankings.index(score1) < hand_rankings.index(score2):
-            return -1
-        else:
-            for hc1, hc2 in zip(high_card1, high_card2):
-                if hc1 > hc2:
-                    return 1
-                elif hc1 < hc2:
-                    return -1
-            return 0
+        suit = _FLUSH_SUIT[suits]
+        if suit < 0:
+            return _RANK_TABLE[key]
 
-    @staticmethod
-    def rank_to_value(rank):
-        rank_values = {'J': 11, 'Q': 12, 'K': 13, 'A': 14}
-        return int(rank) if rank.isdigit() else rank_values.get(rank, rank)
+        mask = 0
+        for card in cards:
+            if card & 3 == suit:
+                mask |= _RANK_BIT[card]
+        return _FLUSH_TABLE[mask]
 
     @staticmethod
-    def is_straight(values):
-        return all(values[i] - 1 == values[i + 1] for i in range(len(values) - 1))
+    def evaluate_batch(cards):
+        """Векторная версия evaluate_hand: массив (N, 5..7) карт -> массив N сил."""
+        cards = np.asarray(cards, dtype=np.int64)
+        strengths = _NP_TABLE_VALUES[np.searchsorted(_NP_TABLE_KEYS, _NP_RANK_KEY[cards].sum(axis=1))]
 
-    @staticmethod
-    def is_four_of_a_kind(values):
-        return 4 in Counter(values).values()
+        suits = _NP_FLUSH_SUIT[_NP_SUIT_KEY[cards].sum(axis=1)]
+        flush = suits >= 0
+        if flush.any():
+            flush_cards = cards[flush]
+            bits = np.where((flush_cards & 3) == suits[flush][:, None], _NP_RANK_BIT[flush_cards], 0)
+            strengths[flush] = _NP_FLUSH_TABLE[np.bitwise_or.reduce(bits, axis=1)]
+        return strengths
 
     @staticmethod
-    def is_full_house(values):
-        value_counts = Counter(values).values()
-        return 3 in value_counts and 2 in value_counts
+    def compare_hands(hand1, hand2):
+        score1 = HandEvaluator.evaluate_hand(hand1)
+        score2 = HandEvaluator.evaluate_hand(hand2)
+        return (score1 > score2) - (score1 < score2)
 
     @staticmethod
-    def is_three_of_a_kind(values):
-        return 3 in Counter(values).values()
+    def hand_category(strength):
+        """Номер категории из HAND_RANKINGS; принимает и число, и массив сил."""
+        return _NP_CATEGORIES[strength]
 
     @staticmethod
-    def is_two_pair(values):
-        return list(Counter(values).values()).count(2) == 2
+    def hand_name(strength):
+        return HAND_RANKINGS[_CATEGORIES[strength]]
 
-    @staticmethod
-    def is_one_pair(values):
-        return 2 in Counter(values).values()
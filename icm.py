@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class ICMCalculator:
+    """Independent Chip Model: ожидаемый денежный выигрыш по стекам оставшихся игроков.
+
+    Модель Малмута — Харвилла: следующее место занимает игрок с вероятностью, равной
+    его доле фишек среди ещё не занявших места. Точный счёт идёт по множествам уже
+    распределённых мест, только на глубину призовых мест и без игроков с нулевым стеком;
+    если таких множеств больше exact_limit, считается Монте-Карло.
+    """
+
+    def __init__(self, payouts, exact_limit=20000, samples=20000, seed=None):
+        self.payouts = np.asarray(payouts, dtype=np.float64)
+        self.exact_limit = exact_limit
+        self.samples = samples
+        self.rng = np.random.default_rng(seed)
+
+    def equity(self, stacks):
+        """Денежное эквити каждого игрока; сумма равна призам за места, которые ещё можно занять."""
+        return self.equities([stacks])[0]
+
+    def equities(self, stack_sets):
+        """Эквити для нескольких раскладов стеков тех же игроков, по строке на расклад.
+
+        Монте-Карло считает все расклады на одних и тех же случайных числах: разность
+        эквити двух раскладов — эффект переданных фишек, а не шум выборки.
+        """
+        stack_sets = np.asarray(stack_sets, dtype=np.float64)
+        result = np.zeros(stack_sets.shape)
+        alive = [np.flatnonzero(stacks > 0) for stacks in stack_sets]
+        if all(self._num_states(len(players), min(len(self.payouts), len(players))) <= self.exact_limit
+               for players in alive):
+            for row, players in enumerate(alive):
+                if len(players):
+                    places = min(len(self.payouts), len(players))
+                    result[row, players] = self._exact(stack_sets[row, players], self.payouts[:places])
+        else:
+            draws = self.rng.exponential(size=(self.samples, stack_sets.shape[1]))
+            for row, stacks in enumerate(stack_sets):
+                result[row] = self._monte_carlo(draws, stacks, self.payouts)
+        return result
+
+    def payoff_factors(self, stacks, player, amount):
+        """Цена фишки в выигрыше и в проигрыше amount для игрока player относительно средней.
+
+        Множители для chip-EV выплат решателя: выигрыш умножается на gain, проигрыш — на
+        loss. Если платят только за первое место, оба равны 1; с ростом давления призовых loss > gain.
+        """
+        stacks = np.asarray(stacks, dtype=np.float64)
+        amount = min(amount, stacks[player])
+        if amount <= 0 or len(stacks) < 2:
+            return 1.0, 1.0
+        chip_value = self.payouts.sum() / stacks.sum()
+
+        # Фишки переходят от остальных игроков (или к ним) пропорционально их стекам
+        others = stacks.copy()
+        others[player] = 0
+        shift = np.zeros(len(stacks))
+        shift[player] = amount
+        shift -= amount * others / others.sum()
+        current, won, lost = self.equities([stacks, stacks + shift, stacks - shift])[:, player]
+        gain = (won - current) / (amount * chip_value)
+        loss = (current - lost) / (amount * chip_value)
+        return gain, loss
+
+    @staticmethod
+    def _num_states(players, places):
+        states, layer = 1, 1
+        for depth in range(places):
+            layer = layer * (players - depth) // (depth + 1)
+            states += layer
+        return states
+
+    @staticmethod
+    def _exact(stacks, payouts):
+        # Проход по местам: слой — множества игроков, занявших первые места (строки маски),
+        # с вероятностью каждого. Шанс на следующее место зависит только от множества —
+        # от оставшихся фишек, — поэтому одинаковые множества из разных порядков сливаются.
+        total = stacks.sum()
+        result = np.zeros(len(stacks))
+        placed = np.zeros((1, len(stacks)), dtype=bool)
+        probability = np.ones(1)
+        for place, payout in enumerate(payouts):
+            remaining = total - placed @ stacks
+            step = probability[:, None] * np.where(placed, 0.0, stacks) / remaining[:, None]
+            result += payout * step.sum(axis=0)
+            if place + 1 == len(payouts):
+                break
+            rows, players = np.nonzero(step)
+            grown = placed[rows]
+            grown[np.arange(len(rows)), players] = True
+            placed, inverse = np.unique(grown, axis=0, return_inverse=True)
+            probability = np.bincount(inverse.ravel(), step[rows, players], minlength=len(placed))
+        return result
+
+    @staticmethod
+    def _monte_carlo(draws, stacks, payouts):
+        # Порядок мест по Малмуту — Харвиллу — это сортировка по Exp(1) / стек; выбывшие — в конце
+        keys = np.divide(draws, stacks, out=np.full(draws.shape, np.inf), where=stacks > 0)
+        places = min(len(payouts), int((stacks > 0).sum()))
+        order = np.argpartition(keys, places - 1, axis=1)[:, :places]
+        order = np.take_along_axis(order, np.argsort(np.take_along_axis(keys, order, axis=1), axis=1), axis=1)
+        winnings = np.zeros(len(stacks))
+        np.add.at(winnings, order, np.broadcast_to(payouts[:places], order.shape))
+        return winnings / len(draws)
@@ -0,0 +1,96 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+PREFIX = 'pokersite'
+
+
+class Metrics:
+    """Счётчики и суммарное время по фазам движка.
+
+    Запись — сложение в словаре без замков: под GIL гонка может потерять единичное
+    приращение, что для мониторинга допустимо, а горячий путь остаётся дешёвым.
+    Скорости (решений/с, раздач/с) считает Prometheus через rate() по счётчикам.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = collections.defaultdict(float)
+        self.phase_seconds = collections.defaultdict(float)
+        self.phase_calls = collections.defaultdict(int)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def observe(self, phase, seconds):
+        self.phase_seconds[phase] += seconds
+        self.phase_calls[phase] += 1
+
+    def reset(self):
+        self.__init__()
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        lines = [
+            f"# TYPE {PREFIX}_uptime_seconds gauge",
+            f"{PREFIX}_uptime_seconds {time.time() - self.started:.3f}",
+        ]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value:g}")
+        if self.phase_calls:
+            lines.append(f"# TYPE {PREFIX}_phase_seconds_total counter")
+            lines.extend(f'{PREFIX}_phase_seconds_total{{phase="{phase}"}} {seconds:.6f}'
+                         for phase, seconds in sorted(self.phase_seconds.items()))
+            lines.append(f"# TYPE {PREFIX}_phase_calls_total counter")
+            lines.extend(f'{PREFIX}_phase_calls_total{{phase="{phase}"}} {calls}'
+                         for phase, calls in sorted(self.phase_calls.items()))
+        return '\n'.join(lines) + '\n'
+
+
+# Общие на процесс метрики
+metrics = Metrics()
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик: поток раз в interval секунд снимает стек целевого потока.
+
+    dump пишет свёрнутые стеки («f1;f2;f3 N» в строке) — формат flamegraph.pl и speedscope.
+    Целевой поток не замедляется ничем, кроме периодического захвата GIL.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, file_name):
+        with open(file_name, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
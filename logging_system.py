@@ -1,25 +1,135 @@
+import atexit
+import json
 import logging
 import logging.handlers
+import os
+import queue
+from cards import card_to_str, cards_to_str
+
+HAND_LOGGER = f"{__name__}.hands"
+
+
+class _Cards:
+    """Карты для ленивого форматирования: в строку переводятся только в потоке записи."""
+    __slots__ = ('cards',)
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def __str__(self):
+        return ', '.join(cards_to_str(self.cards))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Запись уходит в очередь как есть: сообщение собирает поток QueueListener.
+    # Поэтому в аргументах только значения, которые после вызова не меняются.
+    def prepare(self, record):
+        return record
+
+
+class _HandRecordFormatter(logging.Formatter):
+    """Одна раздача — одна строка JSON."""
+
+    def format(self, record):
+        round_number, table_id, board, pot, actions, showdowns = record.msg
+        return json.dumps({
+            'round': round_number,
+            'table': table_id,
+            'board': cards_to_str(board),
+            'pot': pot,
+            'actions': actions,
+            'showdowns': [(player, position, cards_to_str(cards), strength, invested, winnings)
+                          for player, position, cards, strength, invested, winnings in showdowns],
+        }, ensure_ascii=False, separators=(',', ':'))
+
 
 class Logger:
-    def __init__(self, log_file="tournament_log.txt", max_log_size=10 * 1024 * 1024, backup_count=5):
+    """Журнал турнира.
+
+    Вызовы только кладут записи в очередь; форматирование и запись в файлы идут в потоке
+    QueueListener. Отладочные записи (карты, решения) отсекаются проверкой уровня до
+    какой-либо работы. hand_log — необязательный файл JSON lines с раздачей целиком
+    в одной строке вместо строки на каждую карту и решение.
+    """
+
+    def __init__(self, log_file="tournament_log.txt", max_log_size=10 * 1024 * 1024, backup_count=5,
+                 level=None, hand_log=None):
         handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_log_size, backupCount=backup_count)
         handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handler.addFilter(lambda record: record.name != HAND_LOGGER)
+        handlers = [handler]
 
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
+        self.queue = queue.SimpleQueue()
+        self.logger = self._queue_logger(__name__, level or os.environ.get('LOG_LEVEL', 'INFO'))
+        self.hand_logger = None
+        if hand_log:
+            hand_handler = logging.FileHandler(hand_log)
+            hand_handler.setFormatter(_HandRecordFormatter())
+            hand_handler.addFilter(logging.Filter(HAND_LOGGER))
+            handlers.append(hand_handler)
+            self.hand_logger = self._queue_logger(HAND_LOGGER, logging.INFO)
 
-        if not self.logger.hasHandlers():
-            self.logger.addHandler(handler)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.close)
 
-    def log_event(self, message):
-        self.logger.info(message)
+    def _queue_logger(self, name, level):
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.propagate = False
+        logger.handlers = [_DeferredQueueHandler(self.queue)]
+        return logger
+
+    @property
+    def records_hands(self):
+        return self.hand_logger is not None
+
+    def debug_enabled(self):
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def log_event(self, message, *args):
+        self.logger.info(message, *args)
+
+    def log_error(self, message, *args):
+        """Ошибка с трассировкой текущего исключения."""
+        self.logger.error(message, *args, exc_info=True)
+
+    def log_hole_cards(self, player_name, cards):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s получил карты %s", player_name, _Cards(cards))
+
+    def log_community_card(self, card):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Добавлена общая карта: %s", card_to_str(card))
 
     def log_decision(self, player_name, decision, game_state):
-        current_bet = game_state.get("current_bet", 0)
-        stack = game_state.get("current_player").stack if game_state.get("current_player") else "-"
-        community_cards = ', '.join([f"{rank} of {suit}" for rank, suit in game_state.get("community_cards", [])])
-        self.logger.debug(f"{player_name} принимает решение {decision}, текущая ставка: {current_bet}, общие карты: {community_cards}")
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.logger.debug("%s принимает решение %s, текущая ставка: %s, общие карты: %s",
+                          player_name, decision, game_state.get("current_bet", 0),
+                          _Cards(tuple(game_state.get("community_cards", ()))))
 
     def log_result(self, winner_name, pot):
-        self.logger.info(f"{winner_name} выиграл банк в {pot}")
+        self.logger.info("%s выиграл банк в %s", winner_name, pot)
+
+    def log_hand(self, round_number, table_id, board, pot, actions, showdowns):
+        """Аргументы как у HandHistoryWriter.record_hand; списки после вызова не должны меняться."""
+        if self.hand_logger is not None:
+            self.hand_logger.info((round_number, table_id, board, pot, actions, showdowns))
+
+    def close(self):
+        if self.running:
+            self.running = False
+            self.listener.stop()
+
+
+_shared = None
+
+
+def get_logger():
+    """Общий на процесс журнал; HAND_LOG включает запись раздач в JSON lines."""
+    global _shared
+    if _shared is None:
+        _shared = Logger(hand_log=os.environ.get('HAND_LOG'))
+    return _shared
@@ -1,54 +1,213 @@
+import collections
 import random
-from collections import defaultdict
-import pickle
+import threading
+import numpy as np
+from abstraction import ACTIONS, NUM_HISTORIES, InfoSetAbstraction
+from equity import EquityCalculator
+from hand_evaluator import HandEvaluator
+from instrumentation import metrics
+from regret_table import RegretTable
+from strategy_file import StrategyFile, snapshot, write_strategy
+
+BOARD_SIZES = [0, 3, 4, 5]
 
 class MCCFR:
-    def __init__(self, iterations=1000):
+    """Общий для всех игроков решатель.
+
+    Обучение (train, run_records) идёт отдельной фазой пакетами; decide только
+    читает заранее посчитанную среднюю стратегию по номеру информационного множества —
+    из памяти после обучения или из отображённого файла после load_strategy.
+    """
+
+    def __init__(self, iterations=1000, abstraction=None, seed=None, equity_cache_size=100000):
         self.iterations = iterations
-        self.strategy = defaultdict(lambda: [0, 0])  # [регреты, кумулятивная стратегия]
-
-    def run_iterations(self, game_history):
-        for _ in range(self.iterations):
-            self.run_simulation(game_history)
-
-    def run_simulation(self, game_history):
-        actions = ['fold', 'call', 'raise']
-        for action in actions:
-            self.update_regret(game_history, action)
-
-    def update_regret(self, game_history, action):
-        action_probability = self.calculate_action_probability(action)
-        regret = self.calculate_regret(game_history, action)
-        self.strategy[action][0] += regret
-        self.strategy[action][1] += action_probability
-
-    def calculate_action_probability(self, action):
-        cumulative = sum(max(self.strategy[a][0], 0) for a in self.strategy)
-        return max(self.strategy[action][0], 0) / cumulative if cumulative > 0 else 1.0 / len(self.strategy)
-
-    def calculate_regret(self, game_history, action):
-        payoffs = self.get_payoffs_for_actions(game_history)
-        expected_payoff = sum(payoffs[a] * self.calculate_action_probability(a) for a in ['fold', 'call', 'raise'])
-        return payoffs[action] - expected_payoff
-
-    def get_payoffs_for_actions(self, game_history):
-        # Логика получения выгоды для действий
-        return {
-            'fold': -game_history[-1]["current_bet"],
-            'call': random.randint(-game_history[-1]["current_bet"], game_history[-1]["current_bet"]),
-            'raise': random.randint(game_history[-1]["current_bet"], 2 * game_history[-1]["current_bet"]),
-        }
+        self.abstraction = abstraction if abstraction is not None else InfoSetAbstraction()
+        self.regret_table = RegretTable(self.abstraction.num_info_sets, len(ACTIONS))
+        self.equity_calculator = EquityCalculator(samples=500)
+        # LRU: в долгом турнире встречаются всё новые руки, а нужны в основном недавние
+        self.equity_cache = collections.OrderedDict()
+        self.equity_cache_size = equity_cache_size
+        self.pending_records = None
+        self.rng = np.random.default_rng(seed)
+        self.average_strategy = None
+        self.strategy_file = None
+        self.checkpoint_thread = None
+
+    def train(self, iterations, batch_size=4096, checkpoint_every=None, checkpoint_file='mccfr_strategy.bin'):
+        """Обучение на случайных раздачах: iterations обновлений информационных множеств.
+
+        checkpoint_every — через сколько пакетов писать промежуточный файл стратегии (в фоне).
+        """
+        self.prepare_training()
+        for batch, start in enumerate(range(0, iterations, batch_size), 1):
+            self.train_batch(min(batch_size, iterations - start))
+            if checkpoint_every and batch % checkpoint_every == 0:
+                self.save_strategy_async(checkpoint_file)
+        self.wait_checkpoint()
+        self.average_strategy = None
+
+    def prepare_training(self):
+        # Перед дообучением переносим загруженную стратегию из отображённого файла в таблицы
+        if self.strategy_file is not None:
+            self.strategy_file.copy_into(self.regret_table)
+            self.strategy_file = None
+        self.average_strategy = None
+
+    def train_batch(self, batch_size):
+        deals = np.argsort(self.rng.random((batch_size, 52)), axis=1)[:, :9]
+        streets = self.rng.integers(len(BOARD_SIZES), size=batch_size)
+        current_bets = self.rng.integers(10, 101, size=batch_size)
+        history_codes = self.rng.integers(NUM_HISTORIES, size=batch_size)
+
+        # Outcome sampling: исход вскрытия против одной случайной руки на случайном добазаре
+        hero = HandEvaluator.evaluate_batch(np.concatenate([deals[:, :2], deals[:, 4:]], axis=1))
+        villain = HandEvaluator.evaluate_batch(deals[:, 2:])
+        edges = np.sign(hero - villain)
+
+        for street, board_size in enumerate(BOARD_SIZES):
+            rows = streets == street
+            info_sets = self.abstraction.info_set_ids(deals[rows, :2], deals[rows, 4:4 + board_size], history_codes[rows])
+            self.regret_table.update(info_sets, self.payoff_matrix(current_bets[rows], edges[rows]))
+        metrics.count('solver_iterations', batch_size)
+        metrics.count('evaluated_hands', 2 * batch_size)
+
+    def run_records(self, records, fold_frequency=0.0, icm_factors=None):
+        """Дообучение на компактных записях решений (opponent_model.DecisionLog).
+
+        fold_frequency — как часто соперники сбрасывают: рейз дополнительно выигрывает
+        ставку с этой вероятностью. icm_factors — (gain, loss) из ICMCalculator.payoff_factors.
+        Между defer_records и flush_records записи только копятся со своими выплатами.
+        """
+        if not len(records):
+            return
+        info_sets = np.empty(len(records), dtype=np.int64)
+        edges = np.empty(len(records))
+        for board_size in np.unique(records['board_size']).tolist():
+            rows = records['board_size'] == board_size
+            holes = records['hole'][rows].astype(np.int64)
+            boards = records['board'][rows, :board_size].astype(np.int64)
+            info_sets[rows] = self.abstraction.info_set_ids(holes, boards, records['history'][rows])
+            edges[rows] = 2 * self.hand_equities(holes.tolist(), boards.tolist()) - 1
+        current_bets = records['current_bet'].astype(np.float64)
+        payoffs = self.payoff_matrix(current_bets, edges)
+        payoffs[:, ACTIONS.index('raise')] += fold_frequency * current_bets
+        if icm_factors is not None:
+            payoffs = self.icm_payoffs(payoffs, *icm_factors)
+        if self.pending_records is not None:
+            self.pending_records.append((info_sets, payoffs))
+        else:
+            self.train_records(info_sets, payoffs, self.iterations)
+
+    def defer_records(self):
+        """Копить run_records до flush_records: решения всех игроков общего решателя — один пакет."""
+        if self.pending_records is None:
+            self.pending_records = []
+
+    def flush_records(self, iterations=None):
+        pending, self.pending_records = self.pending_records, None
+        if pending:
+            info_sets, payoffs = zip(*pending)
+            self.train_records(np.concatenate(info_sets), np.concatenate(payoffs), iterations or self.iterations)
+
+    def train_records(self, info_sets, payoffs, iterations):
+        self.prepare_training()
+        for _ in range(iterations):
+            self.regret_table.update(info_sets, payoffs)
+        metrics.count('solver_iterations', iterations * len(info_sets))
+        self.average_strategy = None
+
+    @staticmethod
+    def payoff_matrix(current_bets, edges):
+        # Порядок столбцов как в ACTIONS: fold, call, raise
+        return np.stack([-current_bets, edges * current_bets, edges * 2 * current_bets], axis=1).astype(np.float32)
+
+    @staticmethod
+    def icm_payoffs(payoffs, gain, loss):
+        # Фишки в выигрыше и в проигрыше стоят по-разному: выплаты в фишках переводятся в деньги ICM
+        return np.where(payoffs > 0, payoffs * gain, payoffs * loss).astype(np.float32)
+
+    def info_set_id(self, game_state):
+        return self.abstraction.info_set_id(
+            game_state["current_player"].hole_cards,
+            game_state["community_cards"],
+            game_state.get("history", ()),
+        )
+
+    def hand_equity(self, hole_cards, board):
+        key = (tuple(hole_cards), tuple(board))
+        equity = self._cached_equity(key)
+        if equity is None:
+            equity = self.equity_calculator.equity(*key)
+            self._cache_equity(key, equity)
+        return equity
+
+    def hand_equities(self, holes, boards):
+        """Эквити пачки рук; всё, чего нет в кэше, считается одним вызовом batch_equity."""
+        keys = [(tuple(hole), tuple(board)) for hole, board in zip(holes, boards)]
+        equities = {key: self._cached_equity(key) for key in keys}
+        missing = [key for key, equity in equities.items() if equity is None]
+        if missing:
+            for key, equity in zip(missing, self.equity_calculator.batch_equity(missing).tolist()):
+                equities[key] = equity
+                self._cache_equity(key, equity)
+        return np.array([equities[key] for key in keys])
+
+    def _cached_equity(self, key):
+        equity = self.equity_cache.get(key)
+        if equity is not None:
+            self.equity_cache.move_to_end(key)
+        return equity
+
+    def _cache_equity(self, key, equity):
+        self.equity_cache[key] = equity
+        if len(self.equity_cache) > self.equity_cache_size:
+            self.equity_cache.popitem(last=False)
 
     def decide(self, game_state):
-        self.run_iterations(game_state)
-        return max(self.strategy, key=lambda x: self.strategy[x][1])
+        info_set = self.info_set_id(game_state)
+        if self.strategy_file is not None:
+            probabilities = self.strategy_file.lookup(info_set).tolist()
+        else:
+            if self.average_strategy is None:
+                self.average_strategy = self.regret_table.average_strategy(slice(None))
+            probabilities = self.average_strategy[info_set].tolist()
+        threshold = game_state.get("rng", random).random()
+        for action, probability in zip(ACTIONS, probabilities):
+            threshold -= probability
+            if threshold < 0:
+                return action
+        return ACTIONS[-1]
 
-    def save_strategy(self, file_name='mccfr_strategy.pkl'):
-        with open(file_name, 'wb') as f:
-            pickle.dump(self.strategy, f)
+    def save_strategy(self, file_name='mccfr_strategy.bin'):
+        # Фоновая контрольная точка того же файла не должна закончиться позже и затереть эту запись
+        self.wait_checkpoint()
+        self.prepare_training()
+        write_strategy(file_name, snapshot(self.regret_table, self.abstraction.buckets.checksum))
         print(f"Стратегия MCCFR сохранена: {file_name}")
 
-    def load_strategy(self, file_name='mccfr_strategy.pkl'):
-        with open(file_name, 'rb') as f:
-            self.strategy = pickle.load(f)
-            print(f"Стратегия MCCFR загружена: {file_name}")
+    def save_strategy_async(self, file_name='mccfr_strategy.bin'):
+        """Промежуточная контрольная точка: копия таблиц снимается сразу, запись идёт в потоке."""
+        if self.checkpoint_thread is not None and self.checkpoint_thread.is_alive():
+            return self.checkpoint_thread
+        self.prepare_training()
+        table_snapshot = snapshot(self.regret_table, self.abstraction.buckets.checksum)
+        self.checkpoint_thread = threading.Thread(target=write_strategy, args=(file_name, table_snapshot), daemon=True)
+        self.checkpoint_thread.start()
+        return self.checkpoint_thread
+
+    def wait_checkpoint(self):
+        """Дождаться записи контрольной точки, запущенной save_strategy_async."""
+        if self.checkpoint_thread is not None:
+            self.checkpoint_thread.join()
+            self.checkpoint_thread = None
+
+    def load_strategy(self, file_name='mccfr_strategy.bin'):
+        strategy_file = StrategyFile(file_name)
+        if strategy_file.num_info_sets != self.abstraction.num_info_sets:
+            raise ValueError(f"{file_name}: стратегия обучена для другой абстракции")
+        # Тот же размер ещё не значит те же корзины: например, другой hand_buckets.bin в рабочем каталоге
+        if strategy_file.buckets_checksum != self.abstraction.buckets.checksum:
+            raise ValueError(f"{file_name}: стратегия обучена на других таблицах корзин")
+        self.strategy_file = strategy_file
+        self.average_strategy = None
+        print(f"Стратегия MCCFR загружена: {file_name}")
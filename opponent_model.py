@@ -0,0 +1,136 @@
+import numpy as np
+
+from abstraction import ACTIONS, STREETS, history_code
+
+# Компактная запись решения: 16 байт вместо словаря с живыми объектами игры
+DECISION_DTYPE = np.dtype([
+    ('hole', 'u1', 2),
+    ('board', 'u1', 5),
+    ('board_size', 'u1'),
+    ('history', 'u1'),
+    ('street', 'u1'),
+    ('action', 'u1'),
+    ('current_bet', '<i4'),
+])
+
+
+class DecisionLog:
+    """Кольцевой буфер последних capacity решений игрока; старые записи затираются.
+
+    Буфер растёт удвоением до capacity, так что игрок с десятком решений и занимает
+    десяток записей. appended — сколько решений записано за всё время.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.records = np.zeros(0, dtype=DECISION_DTYPE)
+        self.next = 0
+        self.size = 0
+        self.appended = 0
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self):
+        # Заполненный буфер меньше capacity ещё не кольцо: записи лежат по порядку с начала
+        if self.size == len(self.records) < self.capacity:
+            grown = np.zeros(min(self.capacity, max(16, 2 * self.size)), dtype=DECISION_DTYPE)
+            grown[:self.size] = self.records
+            self.records = grown
+            self.next = self.size
+
+    def _push(self, record):
+        self._reserve()
+        self.records[self.next] = record
+        self.next = (self.next + 1) % len(self.records)
+        self.size = min(self.size + 1, len(self.records))
+        self.appended += 1
+
+    def append(self, game_state, decision):
+        board = game_state["community_cards"]
+        # Хвост борда обнуляется: в записи не остаются карты из прошлых решений
+        self._push((
+            game_state["current_player"].hole_cards,
+            tuple(board) + (0,) * (5 - len(board)),
+            len(board),
+            history_code(game_state.get("history", ())),
+            max(len(board) - 2, 0),
+            ACTIONS.index(decision),
+            game_state["current_bet"],
+        ))
+
+    def extend(self, records):
+        for record in records[-self.capacity:]:
+            self._push(record)
+
+    def recent(self, count=None):
+        """Копия последних count записей (по умолчанию всех) от старой к новой."""
+        if self.size < len(self.records):
+            records = self.records[:self.size].copy()
+        else:
+            records = np.concatenate([self.records[self.next:], self.records[:self.next]])
+        return records if count is None else records[len(records) - min(count, len(records)):]
+
+
+class OpponentModel:
+    """Досье на соперников: затухающие счётчики действий по (соперник, улица, действие).
+
+    Счётчики — строки одного массива float32, на соперника len(STREETS) × len(ACTIONS)
+    чисел. Перед каждым новым наблюдением счётчики этой улицы умножаются на decay,
+    так что статистика следит за текущей манерой игры, а не за всей историей.
+    """
+
+    def __init__(self, decay=0.98):
+        self.decay = decay
+        self.opponents = {}
+        self.counts = np.zeros((8, len(STREETS), len(ACTIONS)), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.opponents)
+
+    def _row(self, opponent_name):
+        row = self.opponents.get(opponent_name)
+        if row is None:
+            row = self.opponents[opponent_name] = len(self.opponents)
+            if row == len(self.counts):
+                self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        return row
+
+    def record(self, opponent_name, stage, action):
+        # Строка — до обращения к self.counts: новый соперник может расширить массив
+        row = self._row(opponent_name)
+        counts = self.counts[row, STREETS.index(stage)]
+        counts *= self.decay
+        counts[ACTIONS.index(action)] += 1
+
+    def frequencies(self, opponent_name=None):
+        """Частоты действий (улица × действие) соперника или, без имени, всех соперников вместе."""
+        if opponent_name is None:
+            counts = self.counts[:len(self.opponents)].sum(axis=0)
+        elif opponent_name in self.opponents:
+            counts = self.counts[self.opponents[opponent_name]]
+        else:
+            counts = np.zeros(self.counts.shape[1:], dtype=np.float32)
+        total = counts.sum(axis=1, keepdims=True)
+        uniform = np.full_like(counts, 1.0 / len(ACTIONS))
+        return np.divide(counts, total, out=uniform, where=total > 0)
+
+    def fold_frequency(self, opponent_name=None):
+        """Доля сбросов по всем улицам, взвешенная числом наблюдений."""
+        if opponent_name is None:
+            counts = self.counts[:len(self.opponents)]
+        elif opponent_name in self.opponents:
+            counts = self.counts[self.opponents[opponent_name]]
+        else:
+            return 0.0
+        total = counts.sum()
+        return float(counts[..., ACTIONS.index('fold')].sum() / total) if total > 0 else 0.0
+
+    def state(self):
+        return {"opponents": list(self.opponents), "counts": self.counts[:len(self.opponents)].copy(), "decay": self.decay}
+
+    def restore(self, state):
+        self.decay = state["decay"]
+        self.opponents = {name: row for row, name in enumerate(state["opponents"])}
+        self.counts = np.zeros((max(8, len(self.opponents)), len(STREETS), len(ACTIONS)), dtype=np.float32)
+        self.counts[:len(self.opponents)] = state["counts"]
@@ -0,0 +1,124 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from mccfr import MCCFR
+from regret_table import RegretTable
+
+# Состояние процесса-воркера: общие таблицы, замок и абстракция мастера
+_worker = {}
+
+
+class SharedRegretTable(RegretTable):
+    """Таблица воркера: стратегию считает по общим регретам в разделяемой памяти,
+    а свои приращения копит пакетами и сливает в общие таблицы при flush.
+
+    Приращения сворачиваются по затронутым строкам (np.unique) только при flush, так что
+    память воркера растёт с числом записей между синхронизациями, а не с размером таблиц.
+    """
+
+    def __init__(self, regrets, strategy_sum):
+        self.num_actions = regrets.shape[1]
+        self.regrets = regrets
+        self.strategy_sum = strategy_sum
+        self.pending = []
+
+    def accumulate(self, info_sets, regret_deltas, strategy):
+        self.pending.append((info_sets, regret_deltas, strategy))
+
+    def flush(self, lock):
+        if not self.pending:
+            return
+        info_sets, regret_deltas, strategy = (np.concatenate(parts) for parts in zip(*self.pending))
+        self.pending = []
+        rows, inverse = np.unique(info_sets, return_inverse=True)
+        pending_regrets = np.zeros((len(rows), self.num_actions), dtype=np.float32)
+        pending_strategy_sum = np.zeros_like(pending_regrets)
+        np.add.at(pending_regrets, inverse, regret_deltas)
+        np.add.at(pending_strategy_sum, inverse, strategy)
+        with lock:
+            self.regrets[rows] += pending_regrets
+            self.strategy_sum[rows] += pending_strategy_sum
+
+
+def _attach(names, shape, lock, abstraction):
+    blocks = [SharedMemory(name=name) for name in names]
+    _worker['blocks'] = blocks
+    _worker['arrays'] = [np.ndarray(shape, dtype=np.float32, buffer=block.buf) for block in blocks]
+    _worker['lock'] = lock
+    _worker['abstraction'] = abstraction
+
+
+def _train_worker(iterations, batch_size, sync_every, seed):
+    solver = MCCFR(abstraction=_worker['abstraction'], seed=seed)
+    solver.regret_table = table = SharedRegretTable(*_worker['arrays'])
+    for batch, start in enumerate(range(0, iterations, batch_size), 1):
+        solver.train_batch(min(batch_size, iterations - start))
+        if batch % sync_every == 0:
+            table.flush(_worker['lock'])
+    table.flush(_worker['lock'])
+    return iterations
+
+
+def train_parallel(solver, iterations, workers=None, batch_size=4096, sync_every=8, seed=None, file_name=None):
+    """Обучение solver в нескольких процессах.
+
+    Регреты и суммы стратегий лежат в разделяемой памяти: воркеры читают их напрямую,
+    а каждые sync_every пакетов под замком добавляют свои приращения. Таблицы целиком
+    между процессами не копируются.
+    """
+    workers = workers or os.cpu_count()
+    solver.prepare_training()
+    table = solver.regret_table
+    blocks = [SharedMemory(create=True, size=array.nbytes) for array in (table.regrets, table.strategy_sum)]
+    shared = None
+    try:
+        shared = [np.ndarray(table.regrets.shape, dtype=np.float32, buffer=block.buf) for block in blocks]
+        shared[0][:] = table.regrets
+        shared[1][:] = table.strategy_sum
+
+        context = multiprocessing.get_context()
+        lock = context.Lock()
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(workers)]
+        shares = [iterations // workers + (i < iterations % workers) for i in range(workers)]
+
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach,
+                                 initargs=([block.name for block in blocks], table.regrets.shape, lock, solver.abstraction)) as pool:
+            done = sum(pool.map(_train_worker, shares, [batch_size] * workers, [sync_every] * workers, seeds))
+
+        table.regrets[:] = shared[0]
+        table.strategy_sum[:] = shared[1]
+    finally:
+        shared = None
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    solver.average_strategy = None
+    if file_name:
+        solver.save_strategy(file_name)
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Параллельное обучение MCCFR")
+    parser.add_argument('--iterations', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=4096)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='mccfr_strategy.bin')
+    args = parser.parse_args()
+
+    mccfr_strategy = MCCFR()
+    if os.path.exists(args.output):
+        mccfr_strategy.load_strategy(args.output)
+
+    started = time.perf_counter()
+    done = train_parallel(mccfr_strategy, args.iterations, args.workers, args.batch_size, seed=args.seed, file_name=args.output)
+    elapsed = time.perf_counter() - started
+    print(f"{done} итераций за {elapsed:.1f} с ({done / elapsed:.0f} итераций/с)")
@@ -1,17 +1,25 @@
 import random
 import pickle
 from mccfr import MCCFR
+from opponent_model import DecisionLog, OpponentModel
 
 class PokerPlayer:
-    def __init__(self, name, stack, use_mccfr=True, iterations=1000):
+    def __init__(self, name, stack, use_mccfr=True, iterations=1000, mccfr_strategy=None):
         self.name = name
         self.stack = stack
         self.initial_stack = stack
-        self.history = []
-        self.dossier = {}
+        self.hole_cards = []
+        # Размер состояния игрока не зависит от длины сессии
+        self.history = DecisionLog()
+        self.adjusted = 0
+        self.opponent_model = OpponentModel()
         self.use_mccfr = use_mccfr
         
-        self.strategy_system = MCCFR(iterations) if use_mccfr else BasicPokerStrategy()
+        # Решатель общий для всего турнира; собственный создаётся только для одиночного игрока
+        if use_mccfr:
+            self.strategy_system = mccfr_strategy if mccfr_strategy is not None else MCCFR(iterations)
+        else:
+            self.strategy_system = BasicPokerStrategy()
 
     def make_decision(self, game_state):
         decision = self.strategy_system.decide(game_state)
@@ -19,37 +27,34 @@ class PokerPlayer:
         return decision
     
     def store_decision(self, game_state, decision):
-        self.history.append({
-            "game_state": game_state,
-            "decision": decision
-        })
+        self.history.append(game_state, decision)
 
-    def record_opponent_action(self, opponent_name, action):
-        if opponent_name not in self.dossier:
-            self.dossier[opponent_name] = {"aggro": 0, "fold": 0, "call": 0, "bluff": 0}
-        self.dossier[opponent_name][action] += 1
+    def record_opponent_action(self, opponent_name, stage, action):
+        self.opponent_model.record(opponent_name, stage, action)
 
-    def adjust_strategy(self):
+    def adjust_strategy(self, icm_factors=None):
+        # Дообучение на решениях после прошлой подстройки. Рейз дополнительно выигрывает ставку,
+        # когда соперники сбрасывают; icm_factors — цена фишки на финальном столе (PokerGame.icm_factors)
+        records = self.history.recent(self.history.appended - self.adjusted)
+        self.adjusted = self.history.appended
         if self.use_mccfr:
-            self.strategy_system.run_iterations(self.history)
+            self.strategy_system.run_records(records, self.opponent_model.fold_frequency(), icm_factors)
 
     def save_state(self, file_name=None):
         if file_name is None:
             file_name = f'{self.name}_state.pkl'
         with open(file_name, 'wb') as file:
             pickle.dump({
-                "history": self.history,
-                "dossier": self.dossier,
-                "strategy": self.strategy_system.strategy
+                "history": self.history.recent(),
+                "opponent_model": self.opponent_model.state()
             }, file)
 
     def load_state(self, file_name):
         with open(file_name, 'rb') as file:
             state = pickle.load(file)
-            self.history = state["history"]
-            self.dossier = state["dossier"]
-            self.strategy_system.strategy = state["strategy"]
+        self.history.extend(state["history"])
+        self.opponent_model.restore(state["opponent_model"])
 
 class BasicPokerStrategy:
     def decide(self, game_state):
-        return random.choice(['fold', 'call', 'raise'])
+        return game_state.get("rng", random).choice(['fold', 'call', 'raise'])
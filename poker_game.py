@@ -1,143 +1,352 @@
+import os
 import random
 import asyncio
 import pickle
-from logging_system import Logger
+import time
+from logging_system import get_logger
+from instrumentation import SamplingProfiler, metrics
 from hand_evaluator import HandEvaluator
 from config import PokerTournamentConfig
+from player import PokerPlayer
+from mccfr import MCCFR
+from poker_table import PokerTable, TablesBySize
+from abstraction import ACTIONS, STREETS
+from betting import BettingHand, decode_action
+
+# Сколько общих карт открывается перед торговлей на каждой улице
+BOARD_CARDS = [0, 3, 1, 1]
 
 class PokerGame:
-    def __init__(self, players, config, mccfr_strategy=None):
+    """Турнир в двух режимах.
+
+    Живой режим (tournament_steps, simulate_tournament) отдаёт управление после каждого хода
+    за всеми столами — между ходами вызывающий делает паузу action_delay; состояние после круга
+    передаётся в state_listener; между кругами игроки подстраивают стратегию под соперников.
+    Безголовый режим (headless=True, run_tournament) — обычный синхронный цикл без пауз, логов,
+    подстройки стратегий и веб-сервера для массовых прогонов.
+    """
+
+    def __init__(self, players, config, mccfr_strategy=None, headless=False, action_delay=0.1, seed=None, hand_recorder=None,
+                 state_listener=None, snapshot_writer=None):
         self.players = players
         self.config = config
         self.current_round = 1
-        self.pot = 0
+        # Зерно стола — (зерно турнира, номер стола), см. table_seed
+        self.seed = random.Random(seed).getrandbits(64)
+        self.eliminated = []
+        self.next_table_id = 0
         self.tables = self.create_tables()
-        self.community_cards = []
-        self.deck = self.create_deck()
-        self.logger = Logger()
+        # Те же столы по числу игроков — для пересадок; см. balance_tables
+        self.seating = TablesBySize(self.tables)
+        self.headless = headless
+        self.action_delay = 0 if headless else action_delay
+        self.logger = None if headless else get_logger()
         self.mccfr_strategy = mccfr_strategy
+        self.hand_recorder = hand_recorder
+        self.state_listener = state_listener
+        self.snapshot_writer = snapshot_writer
+        # PROFILE_ROUNDS=N — снять сэмплирующий профиль первых N кругов в PROFILE_FILE
+        self.profile_rounds = int(os.environ.get('PROFILE_ROUNDS', 0))
+        self.profile_file = os.environ.get('PROFILE_FILE', 'profile.folded')
+        self.profiler = None
+        self.icm = config.icm()
+
+    @property
+    def recording_hands(self):
+        return self.hand_recorder is not None or (self.logger is not None and self.logger.records_hands)
 
     def create_tables(self):
-        players_per_table = 8
-        num_tables = len(self.players) // players_per_table
-        tables = [self.players[i * players_per_table:(i + 1) * players_per_table] for i in range(num_tables)]
-        return tables
-
-    def create_deck(self):
-        ranks = list(range(2, 11)) + ['J', 'Q', 'K', 'A']
-        suits = ['hearts', 'diamonds', 'clubs', 'spades']
-        deck = [(rank, suit) for rank in ranks for suit in suits]
-        random.shuffle(deck)
-        return deck
+        # Рассаживаем по кругу, чтобы столы отличались не больше чем на одного игрока
+        num_tables = self.tables_needed(len(self.players))
+        return [self.new_table(self.players[i::num_tables]) for i in range(num_tables)]
+
+    def new_table(self, players):
+        table = PokerTable(self.next_table_id, players, seed=self.table_seed(self.next_table_id))
+        self.next_table_id += 1
+        return table
+
+    def table_seed(self, table_id):
+        return (self.seed << 32) | table_id
+
+    def tables_needed(self, num_players):
+        players_per_table = self.config.players_per_table
+        return max(1, -(-num_players // players_per_table))
+
+    def add_player(self, player):
+        """Посадка нового игрока за самый свободный стол; новый стол — только если все заполнены."""
+        self.players.append(player)
+        table = self.seating.smallest()
+        if table is None or len(table) >= self.config.players_per_table:
+            table = self.new_table([player])
+            self.tables.append(table)
+            self.seating.add(table)
+            self.balance_tables()
+        else:
+            self.seating.add_player(table, player)
+
+    def remove_busted(self, table):
+        """Убирает из-за стола игроков без фишек и возвращает их."""
+        busted = [player for player in table if player.stack <= 0]
+        for player in busted:
+            self.seating.remove_player(table, player)
+        return busted
+
+    def balance_tables(self):
+        """Ломает лишние столы и выравнивает остальные, пересаживая минимум игроков.
+
+        Самый свободный и самый полный стол берутся из индекса по размеру (self.seating),
+        так что пересадка не проходит по всем столам.
+        """
+        seating = self.seating
+        broken = set()
+        while len(seating) > self.tables_needed(len(self.players)):
+            table = seating.smallest()
+            seating.discard(table)
+            broken.add(table.table_id)
+            for player in list(table):
+                seating.add_player(seating.smallest(), player)
+        if broken:
+            self.tables = [table for table in self.tables if table.table_id not in broken]
+
+        while len(seating) > 1:
+            largest = seating.largest()
+            smallest = seating.smallest()
+            if len(largest) - len(smallest) <= 1:
+                break
+            player = largest[-1]
+            seating.remove_player(largest, player)
+            seating.add_player(smallest, player)
+
+    def finish_round(self):
+        busted = [player for table in self.tables for player in self.remove_busted(table)]
+        if busted:
+            # Список игроков пересобирается один раз за круг, а не удалением каждого выбывшего
+            gone = set(busted)
+            self.players = [player for player in self.players if player not in gone]
+            for place, player in enumerate(busted):
+                self.eliminated.append(player)
+                if self.logger:
+                    self.logger.log_event("%s выбыл, место %s", player.name, len(self.players) + len(busted) - place)
+        self.balance_tables()
+
+    def icm_factors(self, index, amount, stacks=None):
+        """Множители ICM для выплат решателя игроку с номером index в self.players.
+
+        До финального стола фишки считаются линейно; stacks — уже собранные стеки игроков.
+        """
+        if len(self.players) > self.config.players_per_table:
+            return 1.0, 1.0
+        if stacks is None:
+            stacks = [player.stack for player in self.players]
+        return self.icm.payoff_factors(stacks, index, amount)
+
+    def standings(self):
+        """Оставшиеся игроки по убыванию стека, за ними выбывшие — от последнего к первому."""
+        return sorted(self.players, key=lambda player: player.stack, reverse=True) + self.eliminated[::-1]
 
     def deal_hole_cards(self, table):
+        started = time.perf_counter()
         for player in table:
-            player.hole_cards = [self.deck.pop(), self.deck.pop()]
-            self.logger.log_event(f"{player.name} получил карты {player.hole_cards}")
+            player.hole_cards = [table.deck.pop(), table.deck.pop()]
+            if self.logger:
+                self.logger.log_hole_cards(player.name, player.hole_cards)
+        metrics.observe('deal', time.perf_counter() - started)
 
-    def deal_community_cards(self, number):
+    def deal_community_cards(self, table, number):
+        started = time.perf_counter()
         for _ in range(number):
-            card = self.deck.pop()
-            self.community_cards.append(card)
-            self.logger.log_event(f"Добавлена общая карта: {card}")
-
-    async def play_one_table(self, table, blinds):
-        self.collect_blinds(table, blinds)
+            card = table.deck.pop()
+            table.community_cards.append(card)
+            if self.logger:
+                self.logger.log_community_card(card)
+        metrics.observe('deal', time.perf_counter() - started)
+
+    def hand_steps(self, table, blinds):
+        """Одна раздача за столом; генератор отдаёт управление после каждого решения."""
+        if len(table) < 2:
+            return
+        table.new_hand()
+        hand = table.hand = BettingHand(table.seats_from_button(), blinds['big_blind'])
+        hand.post_blinds(blinds['small_blind'], blinds.get('ante', 0))
         self.deal_hole_cards(table)
-        await self.conduct_betting_round(table, "Pre-Flop")
-        self.deck.pop()
-
-        self.deal_community_cards(3)
-        await self.conduct_betting_round(table, "Flop")
-        self.deck.pop()
-
-        self.deal_community_cards(1)
-        await self.conduct_betting_round(table, "Turn")
-        self.deck.pop()
-
-        self.deal_community_cards(1)
-        await self.conduct_betting_round(table, "River")
-
-        winner = self.showdown(table)
-        if winner:
-            self.award_pot_to_winner(winner)
-
-    def collect_blinds(self, table, blinds):
-        small_blind, big_blind = blinds['small_blind'], blinds['big_blind']
-        table[0].stack -= small_blind
-        table[1].stack -= big_blind
-        self.pot += small_blind + big_blind
-
-    async def conduct_betting_round(self, table, stage):
-        for player in table:
-            game_state = {
-                "current_bet": random.randint(10, 100),
-                "current_player": player,
-                "community_cards": self.community_cards
-            }
-
-            decision = player.make_decision(game_state, mccfr_strategy=self.mccfr_strategy)
-            self.logger.log_decision(player.name, decision, game_state)
-
-            if decision == "call":
-                self.pot += game_state["current_bet"]
-            elif decision == "raise":
-                raise_amount = random.randint(10, 100)
-                self.pot += raise_amount
-
-            await asyncio.sleep(0.1)
+        for street, (stage, cards) in enumerate(zip(STREETS, BOARD_CARDS)):
+            if street:
+                hand.start_street(street)
+                table.deck.pop()
+                self.deal_community_cards(table, cards)
+            yield from self.betting_round_steps(table, stage)
+            # Остальные сбросили — борд дальше не открывается
+            if hand.contenders == 1:
+                break
+
+        started = time.perf_counter()
+        pot = hand.pot
+        winnings = self.showdown(table)
+        metrics.observe('showdown', time.perf_counter() - started)
+        if self.recording_hands:
+            started = time.perf_counter()
+            self.record_hand(table, winnings, pot)
+            metrics.observe('record', time.perf_counter() - started)
+        table.move_button()
+        metrics.count('hands')
+
+    def play_hand(self, table, blinds):
+        for _ in self.hand_steps(table, blinds):
+            pass
+
+    def betting_round_steps(self, table, stage):
+        hand = table.hand
+        history = []
+        # Одно состояние на улицу: решатель и журнал решений игрока читают его сразу и не хранят
+        game_state = {
+            "current_bet": 0,
+            "current_player": None,
+            "community_cards": table.community_cards,
+            "stage": stage,
+            "history": history,
+            "rng": table.rng
+        }
+        seat = hand.next_to_act()
+        while seat is not None:
+            player = hand.players[seat]
+            game_state["current_player"] = player
+            game_state["current_bet"] = hand.to_call(seat)
+
+            started = time.perf_counter()
+            decision = player.make_decision(game_state)
+            decided = time.perf_counter()
+            metrics.observe('decision', decided - started)
+            metrics.count('decisions')
+            if self.logger:
+                self.logger.log_decision(player.name, decision, game_state)
+                metrics.observe('logging', time.perf_counter() - decided)
+
+            action, _ = hand.act(seat, decision)
+            history.append(ACTIONS[action])
+            if not self.headless:
+                # Соперники за столом видят сыгранное действие, а не исходное решение
+                for other in hand.players:
+                    if other is not player:
+                        other.record_opponent_action(player.name, stage, ACTIONS[action])
+            yield player
+            seat = hand.next_to_act()
 
     def showdown(self, table):
-        hands = {player: player.hole_cards + self.community_cards for player in table}
-
-        best_hand_value = None
-        best_player = None
-
-        for player, hand in hands.items():
-            hand_value = HandEvaluator.evaluate_hand(hand)
-            if not best_hand_value or HandEvaluator.compare_hands(hand, best_hand_value[1]) > 0:
-                best_hand_value = (player, hand)
-
-        return best_hand_value[0] if best_hand_value else None
-
-    def award_pot_to_winner(self, winner):
-        winner.stack += self.pot
-        self.pot = 0
-
-    async def simulate_tournament(self):
-        while len(self.players) > 1:
-            await self.play_round()
-            self.current_round += 1
-
-        if len(self.players) == 1:
-            self.logger.log_event(f"Победитель турнира: {self.players[0].name} со стеком {self.players[0].stack}")
-
-        if self.mccfr_strategy:
-            self.mccfr_strategy.save_strategy()
-
-    async def play_round(self):
-        self.deck = self.create_deck()
+        """Раздел банков раздачи; возвращает выигрыш по местам раздачи."""
+        hand = table.hand
+        if hand.contenders > 1:
+            metrics.count('evaluated_hands', hand.contenders)
+        return hand.award(table.community_cards)
+
+    def record_hand(self, table, winnings, pot):
+        hand = table.hand
+        board = table.community_cards
+        # Сила руки известна только с флопа; в раздаче, закончившейся на префлопе, пишется 0
+        evaluated = len(board) >= 3
+        if evaluated:
+            metrics.count('evaluated_hands', len(hand.players))
+        showdowns = [
+            (player.name, position, player.hole_cards,
+             HandEvaluator.evaluate_hand(player.hole_cards + board) if evaluated else 0,
+             hand.invested[position], winnings[position])
+            for position, player in enumerate(hand.players)
+        ]
+        actions = [(hand.players[seat].name, street, action, amount)
+                   for seat, street, action, amount in map(decode_action, hand.actions)]
+        record = (self.current_round, table.table_id, board, pot, actions, showdowns)
+        if self.hand_recorder:
+            self.hand_recorder.record_hand(*record)
+        if self.logger:
+            self.logger.log_hand(*record)
+
+    def tournament_finished(self, max_rounds):
+        return len(self.players) <= 1 or (max_rounds is not None and self.current_round > max_rounds)
+
+    def tournament_steps(self, max_rounds=None):
+        """Живой турнир; генератор отдаёт управление после каждого хода за всеми столами."""
+        while not self.tournament_finished(max_rounds):
+            self.round_started()
+            yield from self.round_steps()
+            self.round_finished()
+
+        if self.logger and len(self.players) == 1:
+            self.logger.log_event("Победитель турнира: %s со стеком %s", self.players[0].name, self.players[0].stack)
+
+    def round_steps(self):
+        # Раздачи за столами идут параллельно: за шаг каждый стол делает по одному ходу
         blinds = self.config.get_blinds_for_round(self.current_round)
-
-        await asyncio.gather(*[self.play_one_table(table, blinds) for table in self.tables])
-
-        tournament_state = {
-            'tables': self.get_table_state()
-        }
-        from web_server import update_tournament_state
-        update_tournament_state(tournament_state)
+        hands = [self.hand_steps(table, blinds) for table in self.tables]
+        while hands:
+            hands = [hand for hand in hands if next(hand, None) is not None]
+            yield
+
+    async def simulate_tournament(self, max_rounds=None):
+        for _ in self.tournament_steps(max_rounds):
+            await asyncio.sleep(self.action_delay)
+
+    def run_tournament(self, max_rounds=None):
+        """Безголовый прогон без цикла событий; возвращает игроков в порядке занятых мест."""
+        while not self.tournament_finished(max_rounds):
+            self.round_started()
+            blinds = self.config.get_blinds_for_round(self.current_round)
+            for table in self.tables:
+                self.play_hand(table, blinds)
+            self.round_finished()
+        return self.standings()
+
+    def round_started(self):
+        if self.profiler is None and self.current_round <= self.profile_rounds:
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+
+    def round_finished(self):
+        self.finish_round()
+        # Состояние публикуется уже после выбываний и пересадки — таким его увидит следующий круг
+        if self.state_listener:
+            self.state_listener({'tables': self.get_table_state()})
+        if not self.headless:
+            self.adjust_strategies()
+        metrics.count('rounds')
+        if self.profiler is not None and self.current_round >= self.profile_rounds:
+            self.profiler.stop()
+            self.profiler.dump(self.profile_file)
+            self.profiler = None
+            if self.logger:
+                self.logger.log_event("Профиль %s кругов записан в %s", self.profile_rounds, self.profile_file)
+        self.current_round += 1
+        if self.snapshot_writer:
+            self.snapshot_writer.write(self)
+
+    def adjust_strategies(self):
+        """Дообучение между кругами на решениях круга; общий решатель — одним пакетом на всех.
+
+        На финальном столе выплаты переводятся в деньги ICM для ставки в большой блайнд круга.
+        """
+        if self.mccfr_strategy:
+            self.mccfr_strategy.defer_records()
+        final_table = len(self.players) <= self.config.players_per_table
+        stacks = [player.stack for player in self.players] if final_table else None
+        big_blind = self.config.get_blinds_for_round(self.current_round)['big_blind']
+        for index, player in enumerate(self.players):
+            player.adjust_strategy(self.icm_factors(index, big_blind, stacks) if final_table else None)
+        if self.mccfr_strategy:
+            self.mccfr_strategy.flush_records(self.config.dynamic_adjustment(self.current_round))
 
     def get_table_state(self):
         tables_state = []
         for table in self.tables:
             table_info = {
-                'players': [{'name': player.name, 'stack': player.stack, 'cards': player.hole_cards} for player in table]
+                'table_id': table.table_id,
+                'players': [{'name': player.name, 'stack': player.stack, 'cards': list(player.hole_cards)} for player in table]
             }
             tables_state.append(table_info)
         return tables_state
 
-def setup_tournament(num_players=160, load_previous_state=False, mccfr_strategy=None):
+def setup_tournament(num_players=160, load_previous_state=False, mccfr_strategy=None, headless=False, seed=None):
     config = PokerTournamentConfig()
+    # Один решатель на турнир: без него каждый игрок создал бы собственные таблицы
+    if mccfr_strategy is None:
+        mccfr_strategy = MCCFR()
 
     players = []
     for i in range(num_players):
@@ -150,4 +359,4 @@ def setup_tournament(num_players=160, load_previous_state=False, mccfr_strategy=
 
         players.append(player)
 
-    return PokerGame(players, config)
+    return PokerGame(players, config, mccfr_strategy=mccfr_strategy, headless=headless, seed=seed)
@@ -0,0 +1,106 @@
+import random
+from cards import FULL_DECK
+
+class PokerTable:
+    """Состояние одного стола: своя колода, борд, баттон, текущая раздача и генератор случайных чисел.
+
+    Столы ничего не делят между собой, поэтому их раздачи можно играть в любом порядке
+    или в разных процессах — результат определяется только зерном стола. Генератор
+    заново засевается в начале каждой раздачи из (зерно, номер раздачи), так что всё
+    его состояние между раздачами — два числа, которые дёшево сохранить в снимке.
+    """
+
+    def __init__(self, table_id, players, seed=None):
+        self.table_id = table_id
+        self.players = players
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.hands_played = 0
+        self.rng = random.Random()
+        self.deck = []
+        self.community_cards = []
+        self.button = 0
+        self.hand = None
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def __len__(self):
+        return len(self.players)
+
+    def __getitem__(self, index):
+        return self.players[index]
+
+    def add_player(self, player):
+        self.players.append(player)
+
+    def remove_player(self, player):
+        seat = self.players.index(player)
+        del self.players[seat]
+        # Баттон остаётся у того же игрока, что и до пересадки
+        if seat < self.button:
+            self.button -= 1
+        if self.button >= len(self.players):
+            self.button = 0
+
+    def new_hand(self):
+        self.rng.seed((self.seed << 32) | self.hands_played)
+        self.hands_played += 1
+        self.deck = list(FULL_DECK)
+        self.rng.shuffle(self.deck)
+        self.community_cards = []
+
+    def move_button(self):
+        if self.players:
+            self.button = (self.button + 1) % len(self.players)
+
+    def seats_from_button(self):
+        """Игроки по порядку ставок: с малого блайнда, баттон последний. В хедз-апе баттон
+        сам ставит малый блайнд, поэтому идёт первым."""
+        if len(self.players) == 2:
+            return self.players[self.button:] + self.players[:self.button]
+        start = (self.button + 1) % len(self.players)
+        return self.players[start:] + self.players[:start]
+
+
+class TablesBySize:
+    """Столы, разложенные по числу игроков: самый свободный и самый полный стол находятся
+    за проход по размерам, а не по всем столам.
+
+    Игроков за столами из индекса пересаживают через его add_player и remove_player,
+    чтобы стол переходил в корзину нового размера.
+    """
+
+    def __init__(self, tables=()):
+        self.buckets = []   # число игроков -> {номер стола: стол}
+        self.count = 0
+        for table in tables:
+            self.add(table)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, table):
+        while len(self.buckets) <= len(table):
+            self.buckets.append({})
+        self.buckets[len(table)][table.table_id] = table
+        self.count += 1
+
+    def discard(self, table):
+        del self.buckets[len(table)][table.table_id]
+        self.count -= 1
+
+    def smallest(self):
+        return next((next(iter(bucket.values())) for bucket in self.buckets if bucket), None)
+
+    def largest(self):
+        return next((next(iter(bucket.values())) for bucket in reversed(self.buckets) if bucket), None)
+
+    def add_player(self, table, player):
+        self.discard(table)
+        table.add_player(player)
+        self.add(table)
+
+    def remove_player(self, table, player):
+        self.discard(table)
+        table.remove_player(player)
+        self.add(table)
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class RegretTable:
+    """Регреты и суммы стратегий: по строке float32 на информационное множество."""
+
+    def __init__(self, num_info_sets, num_actions):
+        self.num_actions = num_actions
+        # np.zeros не занимает физическую память под строки, которых ещё не касались
+        self.regrets = np.zeros((num_info_sets, num_actions), dtype=np.float32)
+        self.strategy_sum = np.zeros((num_info_sets, num_actions), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.regrets)
+
+    @property
+    def bytes_per_info_set(self):
+        return self.regrets.itemsize * self.num_actions * 2
+
+    def current_strategy(self, info_sets):
+        """Regret matching для массива номеров: положительные регреты, нормированные по строке."""
+        return self._normalize(np.maximum(self.regrets[info_sets], 0))
+
+    def average_strategy(self, info_sets):
+        return self._normalize(self.strategy_sum[info_sets])
+
+    def update(self, info_sets, payoffs):
+        """Одна итерация для пакета информационных множеств; payoffs — (N, num_actions)."""
+        strategy = self.current_strategy(info_sets)
+        expected = (strategy * payoffs).sum(axis=-1, keepdims=True)
+        self.accumulate(info_sets, (payoffs - expected).astype(np.float32), strategy.astype(np.float32))
+
+    def accumulate(self, info_sets, regret_deltas, strategy):
+        np.add.at(self.regrets, info_sets, regret_deltas)
+        np.add.at(self.strategy_sum, info_sets, strategy)
+
+    def _normalize(self, weights):
+        total = weights.sum(axis=-1, keepdims=True)
+        uniform = np.full_like(weights, 1.0 / self.num_actions)
+        return np.divide(weights, total, out=uniform, where=total > 0)
@@ -0,0 +1,106 @@
+import json
+import queue
+import time
+from cards import cards_to_str
+from instrumentation import metrics
+
+
+def table_room(table_id):
+    return f"table-{table_id}"
+
+
+class TableStateBroadcaster:
+    """Рассылка состояния столов дельтами.
+
+    publish не ждёт сети: кладёт состояние в ограниченную очередь, при переполнении
+    вытесняя самое старое. Отдельная фоновая задача не чаще раза в min_interval секунд
+    забирает из очереди последнее состояние, сравнивает его с уже отправленным и шлёт
+    в комнату стола изменившиеся места с порядковым номером. Клиент, пропустивший номер,
+    просит resync и получает снимок стола целиком.
+    """
+
+    def __init__(self, socketio, min_interval=0.5, max_pending=8):
+        self.socketio = socketio
+        self.min_interval = min_interval
+        self.seats = {}         # table_id -> [(имя, стек, карты)] в том виде, в каком они ушли клиентам
+        self.sequences = {}     # table_id -> номер последней дельты
+        self.pending = queue.Queue(max_pending)
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = self.socketio.start_background_task(self._run)
+
+    def publish(self, state):
+        while True:
+            try:
+                self.pending.put_nowait(state)
+                return
+            except queue.Full:
+                try:
+                    self.pending.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.min_interval)
+            self.flush()
+
+    def flush(self):
+        # Промежуточные состояния не нужны: клиенту уходит разница с последним
+        state = None
+        while True:
+            try:
+                state = self.pending.get_nowait()
+            except queue.Empty:
+                break
+        if state is None:
+            return
+
+        started = time.perf_counter()
+        known = set(self.seats)
+        current = set()
+        for table in state['tables']:
+            table_id = table['table_id']
+            current.add(table_id)
+            seats = [(player['name'], player['stack'], tuple(player['cards'])) for player in table['players']]
+            previous = self.seats.get(table_id)
+            if previous is None or len(previous) != len(seats):
+                changed = range(len(seats))
+            else:
+                changed = [seat for seat in range(len(seats)) if seats[seat] != previous[seat]]
+            if not changed:
+                continue
+
+            self.seats[table_id] = seats
+            self.sequences[table_id] = self.sequences.get(table_id, 0) + 1
+            message = self._message(table_id, changed)
+            self.socketio.emit('table_delta', message, to=table_room(table_id))
+            metrics.count('emits')
+            metrics.count('emit_bytes', len(json.dumps(message)))
+
+        closed = self.seats.keys() - current
+        for table_id in closed:
+            del self.seats[table_id]
+            self.socketio.emit('table_closed', {'table_id': table_id}, to=table_room(table_id))
+        if closed or current - known:
+            self.socketio.emit('tables_index', self.index())
+        metrics.observe('emit', time.perf_counter() - started)
+
+    def snapshot(self, table_id):
+        return self._message(table_id, range(len(self.seats.get(table_id, ()))))
+
+    def index(self):
+        return {'tables': {table_id: len(seats) for table_id, seats in self.seats.items()}}
+
+    def _message(self, table_id, changed):
+        seats = self.seats.get(table_id, [])
+        return {
+            'table_id': table_id,
+            'seq': self.sequences.get(table_id, 0),
+            'size': len(seats),
+            # Карты в строки переводятся только для отправляемых мест
+            'seats': {seat: {'name': seats[seat][0], 'stack': seats[seat][1], 'cards': cards_to_str(seats[seat][2])}
+                      for seat in changed},
+        }
@@ -0,0 +1,104 @@
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+# Формат файла стратегии (little-endian, секции выровнены по 64 байта):
+#   заголовок: magic, версия, число действий, размер абстракции, число строк,
+#              CRC32 таблиц корзин, на которых обучена стратегия (BucketTables.checksum)
+#   индекс:    int64[строк] — отсортированные номера информационных множеств
+#   float32[строк, действий] × 3: средняя стратегия, регреты, суммы стратегий
+MAGIC = b'MCCFRSTR'
+VERSION = 2
+_HEADER = struct.Struct('<8sIIQQI')
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _layout(num_rows, num_actions):
+    index_offset = _aligned(_HEADER.size)
+    offsets = [index_offset]
+    offset = _aligned(index_offset + num_rows * 8)
+    for _ in range(3):
+        offsets.append(offset)
+        offset = _aligned(offset + num_rows * num_actions * 4)
+    return offsets, offset
+
+
+def snapshot(regret_table, buckets_checksum):
+    """Копия непустых строк таблицы: быстро, после неё запись может идти в фоне."""
+    info_sets = np.flatnonzero(regret_table.strategy_sum.any(axis=1) | regret_table.regrets.any(axis=1))
+    return (len(regret_table), buckets_checksum, info_sets, regret_table.average_strategy(info_sets).astype(np.float32),
+            regret_table.regrets[info_sets], regret_table.strategy_sum[info_sets])
+
+
+def write_strategy(file_name, table_snapshot):
+    """Атомарная запись: во временный файл рядом, затем os.replace."""
+    num_info_sets, buckets_checksum, info_sets, average, regrets, strategy_sum = table_snapshot
+    num_rows, num_actions = average.shape
+    offsets, size = _layout(num_rows, num_actions)
+
+    # Своё временное имя на каждую запись: параллельные записи одного файла не пишут в общий .tmp
+    handle, temp_name = tempfile.mkstemp(prefix=f"{os.path.basename(file_name)}.", suffix='.tmp',
+                                         dir=os.path.dirname(os.path.abspath(file_name)))
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, num_actions, num_info_sets, num_rows, buckets_checksum))
+            for offset, array, dtype in zip(offsets, (info_sets, average, regrets, strategy_sum), ('<i8', '<f4', '<f4', '<f4')):
+                f.seek(offset)
+                f.write(np.asarray(array, dtype=dtype).tobytes())
+            f.truncate(size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, file_name)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+class StrategyFile:
+    """Файл стратегии, отображённый в память только для чтения.
+
+    Процессы, открывшие один файл, делят его страницы через кэш ОС; открытие не зависит
+    от размера стратегии — читается только заголовок.
+    """
+
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as f:
+            magic, version, num_actions, num_info_sets, num_rows, buckets_checksum = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_name}: не файл стратегии MCCFR")
+        if version != VERSION:
+            raise ValueError(f"{file_name}: неподдерживаемая версия формата {version}")
+
+        self.file_name = file_name
+        self.num_actions = num_actions
+        self.num_info_sets = num_info_sets
+        self.num_rows = num_rows
+        self.buckets_checksum = buckets_checksum
+        offsets, _ = _layout(num_rows, num_actions)
+        self.info_sets = self._map(offsets[0], '<i8', (num_rows,))
+        self.average_strategy, self.regrets, self.strategy_sum = (
+            self._map(offset, '<f4', (num_rows, num_actions)) for offset in offsets[1:])
+        self.uniform = np.full(num_actions, 1.0 / num_actions, dtype=np.float32)
+
+    def _map(self, offset, dtype, shape):
+        if not self.num_rows:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.file_name, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    def lookup(self, info_set):
+        row = int(np.searchsorted(self.info_sets, info_set))
+        if row < self.num_rows and self.info_sets[row] == info_set:
+            return self.average_strategy[row]
+        return self.uniform
+
+    def copy_into(self, regret_table):
+        if len(regret_table) != self.num_info_sets:
+            raise ValueError(f"{self.file_name}: стратегия обучена для другой абстракции")
+        regret_table.regrets[self.info_sets] = self.regrets
+        regret_table.strategy_sum[self.info_sets] = self.strategy_sum
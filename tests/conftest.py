@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PokerTournamentConfig  # noqa: E402
+from mccfr import MCCFR  # noqa: E402
+from player import PokerPlayer  # noqa: E402
+from poker_game import PokerGame  # noqa: E402
+
+
+@pytest.fixture
+def make_game():
+    """Фабрика турниров: игроки Player_0.. с общим решателем, без журнала.
+
+    stacks задаёт стеки поимённо, иначе у num_players игроков стартовый стек из конфигурации.
+    """
+    def make(num_players=16, stacks=None, solver=None, headless=True, seed=0):
+        config = PokerTournamentConfig(file_name=None)
+        if solver is None:
+            solver = MCCFR(iterations=10, seed=0)
+        if stacks is None:
+            stacks = [config.starting_stack] * num_players
+        players = [PokerPlayer(f"Player_{i}", stack, mccfr_strategy=solver) for i, stack in enumerate(stacks)]
+        game = PokerGame(players, config, mccfr_strategy=solver, headless=headless, seed=seed)
+        game.logger = None
+        return game
+    return make
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+from betting import ANTE, BettingHand, decode_action
+from cards import card_from_str
+from poker_table import PokerTable
+
+
+def make_players(*stacks):
+    return [SimpleNamespace(name=f"P{seat}", stack=stack, hole_cards=[]) for seat, stack in enumerate(stacks)]
+
+
+def deal(players, *holes):
+    for player, hole in zip(players, holes):
+        player.hole_cards = [card_from_str(text) for text in hole]
+
+
+def play_to_river(hand, decision='call'):
+    for street in range(4):
+        if street:
+            hand.start_street(street)
+        while (seat := hand.next_to_act()) is not None:
+            hand.act(seat, decision)
+
+
+def test_antes_are_dead_money_and_chips_are_conserved():
+    players = make_players(1000, 1000, 1000)
+    deal(players, ('AH', 'AD'), ('KH', 'KD'), ('2C', '7S'))
+    hand = BettingHand(players, 100)
+    hand.post_blinds(50, ante=10)
+    assert [decode_action(code)[2] for code in hand.actions[:3]] == [ANTE] * 3
+    assert hand.pot == 180 and hand.current_bet == 100 and hand.committed == [50, 100, 0]
+
+    play_to_river(hand)
+    winnings = hand.award([card_from_str(text) for text in ('3S', '8C', '9D', 'JH', '4C')])
+    assert winnings == [hand.pot, 0, 0]
+    assert sum(player.stack for player in players) == 3000
+
+
+def test_side_pot_goes_to_best_hand_among_eligible():
+    players = make_players(300, 1000, 1000)
+    deal(players, ('AH', 'AD'), ('KH', 'KD'), ('QC', 'QS'))
+    hand = BettingHand(players, 100)
+    hand.post_blinds(50)
+    play_to_river(hand, 'raise')
+    winnings = hand.award([card_from_str(text) for text in ('3S', '8C', '9D', 'JH', '4C')])
+    assert winnings[0] == 3 * 300
+    assert winnings[1] == hand.pot - 900 and winnings[2] == 0
+
+
+def test_replay_restores_hand_without_touching_stacks():
+    players = make_players(1000, 500, 2000)
+    deal(players, ('AH', 'AD'), ('KH', 'KD'), ('2C', '7S'))
+    hand = BettingHand(players, 100)
+    hand.post_blinds(50, ante=10)
+    play_to_river(hand, 'raise')
+    hand.award([card_from_str(text) for text in ('3S', '8C', '9D', 'JH', '4C')])
+    stacks = [player.stack for player in players]
+
+    replayed = BettingHand.replay(players, 100, hand.starting_stacks, hand.actions)
+    assert [player.stack for player in players] == stacks
+    assert replayed.invested == hand.invested and replayed.folded == hand.folded
+    assert replayed.actions == hand.actions
+    assert replayed.next_to_act() is None
+
+
+def test_heads_up_button_posts_small_blind_and_acts_first_only_preflop():
+    players = make_players(1000, 1000)
+    table = PokerTable(0, players)
+    table.button = 1
+    seats = table.seats_from_button()
+    assert seats == [players[1], players[0]]
+
+    hand = BettingHand(seats, 100)
+    hand.post_blinds(50)
+    assert hand.committed == [50, 100]
+    assert hand.next_to_act() == 0
+    hand.act(0, 'call')
+    assert hand.next_to_act() == 1
+    hand.act(1, 'call')
+    assert hand.next_to_act() is None
+
+    for street in range(1, 4):
+        hand.start_street(street)
+        assert hand.next_to_act() == 1
+        hand.act(1, 'call')
+        assert hand.next_to_act() == 0
+        hand.act(0, 'call')
+
+    table.move_button()
+    assert table.seats_from_button() == [players[0], players[1]]
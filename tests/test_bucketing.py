@@ -0,0 +1,26 @@
+import numpy as np
+
+from abstraction import InfoSetAbstraction
+from bucketing import BucketTables, postflop_key, postflop_keys
+from cards import card_from_str
+
+
+def cards(*texts):
+    return [card_from_str(text) for text in texts]
+
+
+def test_draw_and_air_with_same_strength_get_different_buckets():
+    board = cards('KH', '7H', '3C')
+    draw, air = cards('AH', '2H'), cards('AD', '2C')
+    abstraction = InfoSetAbstraction(BucketTables.default())
+    assert postflop_key(draw, board) != postflop_key(air, board)
+    assert abstraction.board_bucket(draw, board) != abstraction.board_bucket(air, board)
+
+
+def test_batch_keys_match_single_keys():
+    rng = np.random.default_rng(0)
+    for board_size in (3, 4, 5):
+        deals = np.argsort(rng.random((2000, 52)), axis=1)
+        holes, boards = deals[:, :2], deals[:, 2:2 + board_size]
+        expected = [postflop_key(hole, board) for hole, board in zip(holes.tolist(), boards.tolist())]
+        assert postflop_keys(holes, boards).tolist() == expected
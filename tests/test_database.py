@@ -0,0 +1,49 @@
+from database import HandHistoryWriter, TournamentDatabase
+
+
+def test_checks_do_not_count_as_calls():
+    actions = [('a', 0, 1, 100), ('b', 0, 1, 0), ('a', 1, 1, 0), ('b', 1, 2, 300), ('a', 1, 1, 300)]
+    showdowns = [('a', 0, [0, 1], 0, 400, 800), ('b', 1, [2, 3], 0, 400, 0)]
+    stats = {}
+    HandHistoryWriter._aggregate(actions, showdowns, 3, stats, {}, {})
+    hands, vpip, pfr, raises, calls, wins, profit = stats['a']
+    assert (vpip, calls) == (1, 2)
+    hands, vpip, pfr, raises, calls, wins, profit = stats['b']
+    assert (vpip, raises, calls) == (0, 1, 0)
+
+
+def test_split_pot_refund_is_not_a_win_and_stage_is_where_hand_ended():
+    # Оба в олл-ине на префлопе, банк поделён; дальше улиц с действиями не было
+    actions = [('a', 0, 2, 500), ('b', 0, 1, 500)]
+    showdowns = [('a', 0, [0, 1], 0, 500, 500), ('b', 1, [2, 3], 0, 500, 500)]
+    stats, stage_stats = {}, {}
+    HandHistoryWriter._aggregate(actions, showdowns, 3, stats, {}, stage_stats)
+    assert stats['a'][5] == 0 and stats['b'][5] == 0
+    assert set(stage_stats) == {('a', 3), ('b', 3)}
+
+    # Раздача кончилась на флопе сбросом: победитель записан на флопе, а не на ривере
+    actions = [('a', 0, 1, 100), ('b', 0, 1, 0), ('a', 1, 2, 100), ('b', 1, 0, 0)]
+    showdowns = [('a', 0, [0, 1], 0, 200, 300), ('b', 1, [2, 3], 0, 100, 0)]
+    stats, stage_stats = {}, {}
+    HandHistoryWriter._aggregate(actions, showdowns, 1, stats, {}, stage_stats)
+    assert stats['a'][5] == 1 and stats['b'][5] == 0
+    assert set(stage_stats) == {('a', 1), ('b', 1)}
+
+
+def test_concurrent_writers_get_distinct_hand_ids_and_survive_bad_batches(tmp_path):
+    db = TournamentDatabase(str(tmp_path / 'results.db'))
+    writers = [db.hand_writer(db.start_tournament(2), batch_size=1) for _ in range(2)]
+    showdowns = [('a', 0, [0, 1], 0, 100, 200), ('b', 1, [2, 3], 0, 100, 0)]
+    for round_number in range(50):
+        for writer in writers:
+            writer.record_hand(round_number, 0, [4, 5, 6], 200, [('a', 0, 1, 100)], showdowns)
+    # Испорченная раздача теряется, следующие пишутся как обычно
+    writers[0].record_hand(50, 0, [4, 5, 6], 200, [('a', 0, 1)], showdowns)
+    writers[0].record_hand(51, 0, [4, 5, 6], 200, [('a', 0, 1, 100)], showdowns)
+    for writer in writers:
+        writer.close()
+
+    counts = db.conn.execute('SELECT tournament_id, COUNT(*) FROM hands GROUP BY tournament_id').fetchall()
+    assert [count for _, count in counts] == [51, 50]
+    assert db.fetch_player_stats('a')['hands'] == 101
+    db.close()
@@ -0,0 +1,94 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+
+from hand_evaluator import HAND_RANKINGS, HandEvaluator
+
+
+def reference_five(cards):
+    """(категория, ранги для сравнения) пятикарточной руки — прямой разбор по правилам."""
+    ranks = sorted((card >> 2 for card in cards), reverse=True)
+    flush = len({card & 3 for card in cards}) == 1
+    unique = sorted(set(ranks), reverse=True)
+    straight_high = None
+    if len(unique) == 5:
+        if unique[0] - unique[4] == 4:
+            straight_high = unique[0]
+        elif unique == [12, 3, 2, 1, 0]:
+            straight_high = 3
+
+    groups = sorted(Counter(ranks).items(), key=lambda item: (item[1], item[0]), reverse=True)
+    counts = [count for _, count in groups]
+    ordered = [rank for rank, _ in groups]
+    if straight_high is not None and flush:
+        return 8, [straight_high]
+    if counts[0] == 4:
+        return 7, ordered
+    if counts[:2] == [3, 2]:
+        return 6, ordered
+    if flush:
+        return 5, ranks
+    if straight_high is not None:
+        return 4, [straight_high]
+    if counts[0] == 3:
+        return 3, ordered
+    if counts[:2] == [2, 2]:
+        return 2, ordered
+    if counts[0] == 2:
+        return 1, ordered
+    return 0, ranks
+
+
+def reference(cards):
+    return max(reference_five(five) for five in combinations(cards, 5))
+
+
+def random_hands(size, count, seed):
+    rng = random.Random(seed)
+    return [rng.sample(range(52), size) for _ in range(count)]
+
+
+def check_against_reference(hands):
+    strengths = [HandEvaluator.evaluate_hand(hand) for hand in hands]
+    references = [reference(hand) for hand in hands]
+    # Порядок сил должен совпасть с эталонным, равенство — с равенством рук
+    order = sorted(range(len(hands)), key=lambda number: references[number])
+    for previous, current in zip(order, order[1:]):
+        if references[previous] == references[current]:
+            assert strengths[previous] == strengths[current]
+        else:
+            assert strengths[previous] < strengths[current]
+    for strength, (category, _) in zip(strengths, references):
+        assert HandEvaluator.hand_name(strength) == HAND_RANKINGS[category]
+    return strengths
+
+
+def test_five_six_and_seven_cards_match_best_five_of_reference():
+    for size in (5, 6, 7):
+        check_against_reference(random_hands(size, 3000, seed=size))
+
+
+def test_every_category_and_wheel_edge_cases():
+    hands = [
+        [48, 1, 6, 8, 12],              # стрит от туза до пятёрки
+        [48, 1, 6, 8, 12, 17, 20],      # стрит до семёрки старше колеса
+        [48, 1, 6, 8, 12, 2, 7],        # колесо с парами — всё ещё стрит
+        [44, 40, 36, 32, 48],           # стрит-флеш от десятки до туза
+        [0, 4, 8, 12, 48],              # стрит-флеш от туза до пятёрки
+        [0, 1, 2, 3, 48],               # каре
+        [0, 1, 2, 4, 5],                # фулл-хаус
+        [0, 1, 2, 4, 5, 6, 8],          # два сета — фулл-хаус
+        [0, 8, 16, 24, 44, 4],          # флеш с шестой картой
+        [0, 1, 4, 5, 8, 9, 12],         # три пары
+    ]
+    strengths = check_against_reference(hands + random_hands(7, 500, seed=0))
+    assert {HandEvaluator.hand_name(strength) for strength in strengths} == set(HAND_RANKINGS)
+
+
+def test_batch_matches_single_hand_evaluation():
+    for size in (5, 6, 7):
+        hands = random_hands(size, 2000, seed=10 + size)
+        expected = [HandEvaluator.evaluate_hand(hand) for hand in hands]
+        assert HandEvaluator.evaluate_batch(np.array(hands)).tolist() == expected
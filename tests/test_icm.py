@@ -0,0 +1,70 @@
+from itertools import permutations
+
+import numpy as np
+
+from config import PokerTournamentConfig
+from icm import ICMCalculator
+from mccfr import MCCFR
+from opponent_model import DECISION_DTYPE
+
+# Пузырь: четверо, платят троим, у последнего игрока почти нет фишек
+BUBBLE_STACKS = [40000, 40000, 38000, 2000]
+
+
+def test_equity_sums_to_prize_pool():
+    equity = ICMCalculator([50, 30, 20]).equity(BUBBLE_STACKS)
+    assert abs(equity.sum() - 100) < 1e-9
+    assert equity[0] == equity[1] > equity[2] > equity[3]
+
+
+def test_bubble_makes_losing_chips_cost_more_than_winning():
+    gain, loss = ICMCalculator([50, 30, 20]).payoff_factors(BUBBLE_STACKS, 0, 10000)
+    assert loss > gain
+    assert np.allclose(ICMCalculator([100]).payoff_factors(BUBBLE_STACKS, 0, 10000), 1.0)
+
+
+def test_exact_equity_matches_enumerated_finishing_orders():
+    stacks, payouts = [5000, 3000, 1500, 500, 0], [50, 30, 20]
+    expected = np.zeros(len(stacks))
+    for order in permutations(range(4)):
+        probability, remaining = 1.0, sum(stacks)
+        for player in order:
+            probability *= stacks[player] / remaining
+            remaining -= stacks[player]
+        for place, player in enumerate(order[:len(payouts)]):
+            expected[player] += probability * payouts[place]
+    assert np.allclose(ICMCalculator(payouts).equity(stacks), expected)
+
+
+def test_monte_carlo_factors_share_draws_across_stack_shifts():
+    exact = ICMCalculator([50, 30, 20]).payoff_factors(BUBBLE_STACKS, 0, 10000)
+    for seed in range(5):
+        gain, loss = ICMCalculator([50, 30, 20], exact_limit=0, seed=seed).payoff_factors(BUBBLE_STACKS, 0, 10000)
+        assert loss > gain
+        assert np.allclose((gain, loss), exact, atol=0.03)
+
+
+def test_final_table_passes_icm_factors_to_solver_payoffs(make_game):
+    game = make_game(stacks=BUBBLE_STACKS)
+    game.current_round = 8
+    received = {}
+    for player in game.players:
+        player.adjust_strategy = lambda icm_factors=None, name=player.name: received.__setitem__(name, icm_factors)
+    game.adjust_strategies()
+    gain, loss = received["Player_0"]
+    assert loss > gain
+
+    records = np.zeros(1, dtype=DECISION_DTYPE)
+    records['hole'] = [[48, 49]]
+    records['current_bet'] = 10000
+    chip_ev = MCCFR(iterations=1, seed=0)
+    chip_ev.run_records(records)
+    bubble = MCCFR(iterations=1, seed=0)
+    bubble.equity_cache = chip_ev.equity_cache
+    bubble.run_records(records, icm_factors=(gain, loss))
+    assert not np.allclose(chip_ev.regret_table.regrets, bubble.regret_table.regrets)
+
+
+def test_icm_is_linear_before_final_table(make_game):
+    game = make_game(PokerTournamentConfig(file_name=None).players_per_table + 1)
+    assert game.icm_factors(0, 1000) == (1.0, 1.0)
@@ -0,0 +1,34 @@
+import pytest
+
+from abstraction import InfoSetAbstraction
+from bucketing import BucketTables
+from mccfr import MCCFR
+
+
+def test_equity_cache_keeps_only_recent_hands():
+    solver = MCCFR(seed=0, equity_cache_size=3)
+    hands = [([0, 1], [8, 12, 16]), ([2, 3], [8, 12, 16]), ([4, 5], [8, 12, 16])]
+    for hole, board in hands:
+        solver.hand_equity(hole, board)
+    solver.hand_equity(*hands[0])
+    solver.hand_equities([[6, 7]], [[8, 12, 16]])
+    assert len(solver.equity_cache) == 3
+    assert ((0, 1), (8, 12, 16)) in solver.equity_cache
+    assert ((2, 3), (8, 12, 16)) not in solver.equity_cache
+
+
+def test_strategy_trained_on_other_buckets_is_rejected(tmp_path):
+    file_name = str(tmp_path / 'strategy.bin')
+    solver = MCCFR(seed=0)
+    solver.train(4096)
+    solver.save_strategy(file_name)
+    MCCFR().load_strategy(file_name)
+
+    # Те же размеры таблиц, но другие корзины — номера информационных множеств значат другое
+    default = BucketTables.default()
+    shuffled = BucketTables(default.preflop[::-1], default.postflop)
+    assert shuffled.num_preflop_buckets == default.num_preflop_buckets
+    other = MCCFR(abstraction=InfoSetAbstraction(shuffled))
+    assert other.abstraction.num_info_sets == solver.abstraction.num_info_sets
+    with pytest.raises(ValueError):
+        other.load_strategy(file_name)
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from opponent_model import DecisionLog, OpponentModel
+
+
+def test_opponent_models_are_fed_during_a_hand(make_game):
+    game = make_game(headless=False)
+    table = game.tables[0]
+    game.play_hand(table, game.config.get_blinds_for_round(1))
+    for player in table:
+        others = {other.name for other in table if other is not player}
+        assert player.opponent_model.opponents.keys() <= others
+        assert player.opponent_model.counts.sum() > 0
+
+
+def test_round_adjusts_shared_solver_on_new_decisions(make_game):
+    game = make_game(headless=False)
+    blinds = game.config.get_blinds_for_round(1)
+    for table in game.tables:
+        game.play_hand(table, blinds)
+    game.round_finished()
+    assert game.mccfr_strategy.regret_table.strategy_sum.any()
+    assert all(player.adjusted == player.history.appended for player in game.players)
+
+
+def test_headless_game_does_not_track_opponents(make_game):
+    game = make_game()
+    game.play_hand(game.tables[0], game.config.get_blinds_for_round(1))
+    assert all(len(player.opponent_model) == 0 for player in game.players)
+
+
+def test_opponent_model_grows_past_initial_capacity():
+    model = OpponentModel()
+    for i in range(20):
+        model.record(f"opponent_{i}", 'Flop', 'fold')
+    assert len(model) == 20
+    assert model.fold_frequency('opponent_19') == 1.0
+
+
+def test_decision_log_clears_board_tail_and_keeps_latest():
+    log = DecisionLog(capacity=4)
+    player = SimpleNamespace(hole_cards=[0, 1])
+    for bet, board in enumerate([[5, 6, 7, 8, 9], [10, 11, 12], [], [13, 14, 15, 16], [17, 18, 19]]):
+        log.append({"community_cards": board, "current_player": player, "current_bet": bet}, 'call')
+    records = log.recent()
+    assert records['current_bet'].tolist() == [1, 2, 3, 4]
+    assert records['board'][0].tolist() == [10, 11, 12, 0, 0]
+    assert not records['board'][1].any()
+    assert log.recent(2)['current_bet'].tolist() == [3, 4]
+    assert np.array_equal(log.recent(0), records[:0])
@@ -0,0 +1,25 @@
+import threading
+
+import numpy as np
+
+from parallel_training import SharedRegretTable
+from regret_table import RegretTable
+
+
+def test_flush_adds_the_same_increments_as_a_local_table():
+    rng = np.random.default_rng(0)
+    local = RegretTable(1000, 3)
+    shared = SharedRegretTable(np.zeros((1000, 3), dtype=np.float32), np.zeros((1000, 3), dtype=np.float32))
+    for _ in range(4):
+        info_sets = rng.integers(0, 50, size=256)
+        deltas = rng.standard_normal((256, 3)).astype(np.float32)
+        strategy = rng.random((256, 3)).astype(np.float32)
+        local.accumulate(info_sets, deltas, strategy)
+        shared.accumulate(info_sets, deltas, strategy)
+    # До синхронизации общие таблицы не тронуты
+    assert not shared.regrets.any()
+
+    shared.flush(threading.Lock())
+    assert np.allclose(shared.regrets, local.regrets, atol=1e-5)
+    assert np.allclose(shared.strategy_sum, local.strategy_sum, atol=1e-5)
+    assert shared.pending == []
@@ -0,0 +1,41 @@
+from player import PokerPlayer
+
+
+def check_seating(game):
+    seated = [player for table in game.tables for player in table]
+    assert sorted(seated, key=id) == sorted(game.players, key=id)
+    assert len(game.tables) == game.tables_needed(len(game.players)) == len(game.seating)
+    sizes = [len(table) for table in game.tables]
+    assert max(sizes) - min(sizes) <= 1 and max(sizes) <= game.config.players_per_table
+
+
+def test_add_player_seats_everyone_and_opens_tables_only_when_full(make_game):
+    game = make_game(20)
+    check_seating(game)
+    assert len(game.tables) == 3
+
+    for i in range(20, 25):
+        game.add_player(PokerPlayer(f"Player_{i}", game.config.starting_stack, mccfr_strategy=game.mccfr_strategy))
+        check_seating(game)
+    assert len(game.players) == 25 and len(game.tables) == 4
+
+
+def test_busted_players_break_tables_and_are_eliminated_in_order(make_game):
+    game = make_game(21)
+    busted = [player for table in game.tables for player in list(table)[:2]] + [game.tables[0][2]]
+    for player in busted:
+        player.stack = 0
+    expected = [player for table in game.tables for player in table if player.stack == 0]
+
+    game.finish_round()
+    check_seating(game)
+    assert len(game.players) == 14 and len(game.tables) == 2
+    assert game.eliminated == expected
+    assert game.standings()[-len(expected):] == expected[::-1]
+
+    # Выбывания до одного стола и до одного игрока
+    for player in game.players[:-1]:
+        player.stack = 0
+    game.finish_round()
+    check_seating(game)
+    assert len(game.players) == 1 and len(game.eliminated) == 20
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pytest
+
+from mccfr import MCCFR
+from tournament_snapshot import _HEADER, SnapshotWriter, load_game
+
+
+def play_rounds(game, rounds):
+    for _ in range(rounds):
+        blinds = game.config.get_blinds_for_round(game.current_round)
+        for table in game.tables:
+            game.play_hand(table, blinds)
+        game.round_finished()
+
+
+def stored_generation(file_name):
+    with open(file_name, 'rb') as f:
+        return _HEADER.unpack(f.read(_HEADER.size))[2]
+
+
+def test_stale_delta_from_previous_run_is_not_replayed(tmp_path, make_game):
+    file_name = str(tmp_path / 'tournament.snapshot')
+    solver = MCCFR(seed=0)
+
+    first = make_game(24, solver=solver, seed=7)
+    first.snapshot_writer = SnapshotWriter(file_name, full_every=10)
+    play_rounds(first, 3)
+    first.snapshot_writer.close()
+    stale_delta = str(tmp_path / 'stale.delta')
+    shutil.copy(f"{file_name}.delta", stale_delta)
+
+    # Новый запуск пишет новый полный снимок и обрывается до того, как заменит журнал дельт
+    second = make_game(24, solver=solver, seed=7)
+    writer = SnapshotWriter(file_name)
+    assert writer.generation == stored_generation(file_name)
+    play_rounds(second, 1)
+    writer.write_full(second)
+    writer.close()
+    os.replace(stale_delta, f"{file_name}.delta")
+
+    resumed = load_game(file_name, mccfr_strategy=solver)
+    assert resumed.current_round == second.current_round
+    assert [player.stack for player in resumed.players] == [player.stack for player in second.players]
+
+
+def test_snapshot_without_complete_record_is_rejected(tmp_path, make_game):
+    file_name = str(tmp_path / 'tournament.snapshot')
+    solver = MCCFR(seed=0)
+    game = make_game(24, solver=solver, seed=7)
+    game.snapshot_writer = SnapshotWriter(file_name)
+    play_rounds(game, 1)
+    game.snapshot_writer.close()
+
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    with open(file_name, 'wb') as f:
+        f.write(data[:-1])
+    with pytest.raises(ValueError):
+        load_game(file_name, mccfr_strategy=solver)
+
+
+def test_resumed_solver_keeps_regrets_learned_during_tournament(tmp_path, make_game):
+    file_name = str(tmp_path / 'tournament.snapshot')
+    solver = MCCFR(seed=0)
+    game = make_game(24, solver=solver, seed=7)
+    game.snapshot_writer = SnapshotWriter(file_name)
+    # Решатель дообучается уже по ходу турнира
+    solver.train(4096)
+    play_rounds(game, 1)
+    game.snapshot_writer.close()
+
+    resumed = load_game(file_name).mccfr_strategy
+    resumed.prepare_training()
+    assert resumed.regret_table.regrets.any()
+    assert (resumed.regret_table.regrets == solver.regret_table.regrets).all()
@@ -0,0 +1,54 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mccfr import MCCFR
+from poker_game import setup_tournament
+
+# Решатель процесса-воркера: файл стратегии отображается в память один раз на процесс
+_worker = {}
+
+
+def _load_solver(strategy_file):
+    solver = MCCFR()
+    if strategy_file:
+        solver.load_strategy(strategy_file)
+    _worker['solver'] = solver
+
+
+def _run_one(num_players, max_rounds, seed):
+    game = setup_tournament(num_players=num_players, mccfr_strategy=_worker['solver'], headless=True, seed=seed)
+    return [(player.name, player.stack) for player in game.run_tournament(max_rounds)]
+
+
+def run_tournaments(num_tournaments, num_players=160, strategy_file='mccfr_strategy.bin', max_rounds=None, workers=None, seed=None):
+    """Независимые безголовые турниры в пуле процессов.
+
+    Каждый турнир получает своё зерно из seed, а результаты (пары имя/стек по местам)
+    возвращаются в порядке зёрен — при одном seed итог не зависит от числа воркеров.
+    """
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(num_tournaments)]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers, initializer=_load_solver, initargs=(strategy_file,)) as pool:
+        return list(pool.map(_run_one, [num_players] * num_tournaments, [max_rounds] * num_tournaments, seeds,
+                             chunksize=max(1, num_tournaments // (workers * 4))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Массовый прогон турниров для оценки стратегии")
+    parser.add_argument('--tournaments', type=int, default=100)
+    parser.add_argument('--players', type=int, default=160)
+    parser.add_argument('--max-rounds', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--strategy', default='mccfr_strategy.bin')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_tournaments(args.tournaments, args.players, args.strategy if os.path.exists(args.strategy) else None,
+                              args.max_rounds, args.workers, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"{len(results)} турниров за {elapsed:.1f} с")
@@ -0,0 +1,267 @@
+import os
+import random
+import struct
+import zlib
+
+import numpy as np
+
+from config import PokerTournamentConfig
+from mccfr import MCCFR
+from player import PokerPlayer
+from poker_game import PokerGame
+from poker_table import PokerTable, TablesBySize
+
+# Снимок турнира — три файла:
+#   file_name           полный снимок: заголовок и одна запись относительно пустого турнира
+#   file_name.delta     заголовок и дописываемые записи — изменения за круг относительно предыдущей
+#   file_name.strategy  контрольная точка решателя на момент полного снимка
+# Запись — массивы (uint32 длина + данные) в порядке _FIELDS; в журнале перед записью
+# длина и CRC32, так что оборванный при падении хвост просто отбрасывается.
+MAGIC = b'PKRSNAPS'
+DELTA_MAGIC = b'PKRDELTA'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIQ')       # magic, версия, поколение, зерно турнира
+_DELTA_HEADER = struct.Struct('<8sII')  # magic, версия, поколение полного снимка
+_RECORD = struct.Struct('<II')          # длина, CRC32
+_COUNT = struct.Struct('<I')
+
+_FIELDS = [
+    ('round', '<i4'),            # [текущий круг, следующий номер стола]
+    ('new_names', 'S'),          # имена новых игроков через \n
+    ('new_initial', '<i8'),      # их начальные стеки
+    ('stack_players', '<i4'),    # игроки, чей стек изменился
+    ('stacks', '<i8'),
+    ('eliminated', '<i4'),       # выбывшие за круг, по порядку
+    ('table_ids', '<i4'),        # все столы в порядке турнира
+    ('buttons', '<i4'),
+    ('hands_played', '<i8'),
+    ('seated_tables', '<i4'),    # столы, где поменялась рассадка
+    ('seat_counts', '<i4'),
+    ('seats', '<i4'),
+]
+
+
+def _encode(record):
+    chunks = []
+    for name, dtype in _FIELDS:
+        if dtype == 'S':
+            data = '\n'.join(record[name]).encode('utf-8')
+        else:
+            data = np.asarray(record[name], dtype=dtype).tobytes()
+        chunks.append(_COUNT.pack(len(data)))
+        chunks.append(data)
+    return b''.join(chunks)
+
+
+def _decode(payload):
+    record, offset = {}, 0
+    for name, dtype in _FIELDS:
+        (size,) = _COUNT.unpack_from(payload, offset)
+        data = payload[offset + _COUNT.size:offset + _COUNT.size + size]
+        offset += _COUNT.size + size
+        if dtype == 'S':
+            record[name] = data.decode('utf-8').split('\n') if data else []
+        else:
+            record[name] = np.frombuffer(data, dtype=dtype)
+    return record
+
+
+def _framed(payload):
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _stored_generation(file_name):
+    # Поколение существующего снимка; без него — случайное, чтобы не совпасть со старым журналом дельт
+    try:
+        with open(file_name, 'rb') as f:
+            magic, _, generation, _ = _HEADER.unpack(f.read(_HEADER.size))
+        if magic == MAGIC:
+            return generation
+    except (OSError, struct.error):
+        pass
+    return random.getrandbits(32)
+
+
+def _write_atomic(file_name, data):
+    temp_name = f"{file_name}.tmp"
+    with open(temp_name, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_name, file_name)
+
+
+class SnapshotWriter:
+    """Периодические снимки турнира: полный раз в full_every кругов, между ними — дельты.
+
+    Пишущий помнит то, что уже записано (стеки, рассадку столов), и в дельту кладёт только
+    изменения; полный снимок заменяется атомарно, журнал дельт после него начинается заново.
+    Поколения продолжают нумерацию снимка, уже лежащего в file_name: журнал дельт прошлого
+    запуска не подойдёт к новому полному снимку, даже если запись оборвалась между файлами.
+    """
+
+    def __init__(self, file_name='tournament.snapshot', full_every=10):
+        self.file_name = file_name
+        self.delta_name = f"{file_name}.delta"
+        self.strategy_name = f"{file_name}.strategy"
+        self.solver = None
+        self.full_every = full_every
+        self.generation = _stored_generation(file_name)
+        self.rounds_since_full = None
+        self.delta = None
+
+    def write(self, game):
+        if self.rounds_since_full is None or self.rounds_since_full >= self.full_every:
+            self.write_full(game)
+        else:
+            self.write_delta(game)
+
+    def write_full(self, game):
+        self.roster, self.index = [], {}
+        self.stacks, self.seatings, self.eliminated = [], {}, 0
+        self.generation = (self.generation + 1) & 0xFFFFFFFF
+        record = self._changes(game)
+
+        # Решатель в снимок не копируется: рядом в фоне пишется его контрольная точка с
+        # регретами, набранными за турнир, а в снимке — путь к ней. Предыдущую запись
+        # дожидаемся, иначе save_strategy_async вернёт её поток и новая точка пропадёт.
+        self.solver = game.mccfr_strategy
+        strategy = b''
+        if self.solver is not None:
+            self.solver.wait_checkpoint()
+            self.solver.save_strategy_async(self.strategy_name)
+            strategy = self.strategy_name.encode('utf-8')
+        _write_atomic(self.file_name, _HEADER.pack(MAGIC, VERSION, self.generation, game.seed)
+                      + _COUNT.pack(len(strategy)) + strategy + _framed(_encode(record)))
+        if self.delta is not None:
+            self.delta.close()
+        _write_atomic(self.delta_name, _DELTA_HEADER.pack(DELTA_MAGIC, VERSION, self.generation))
+        self.delta = open(self.delta_name, 'ab')
+        self.rounds_since_full = 0
+
+    def write_delta(self, game):
+        self.delta.write(_framed(_encode(self._changes(game))))
+        self.delta.flush()
+        self.rounds_since_full += 1
+
+    def close(self):
+        if self.delta is not None:
+            self.delta.close()
+            self.delta = None
+        if self.solver is not None:
+            self.solver.wait_checkpoint()
+
+    def _changes(self, game):
+        # Выбывшие тоже в составе: полный снимок хранит их порядок для итоговых мест
+        new_players = [player for player in game.players + game.eliminated if player not in self.index]
+        for player in new_players:
+            self.index[player] = len(self.roster)
+            self.roster.append(player)
+            self.stacks.append(None)
+
+        changed = [number for number, player in enumerate(self.roster) if player.stack != self.stacks[number]]
+        for number in changed:
+            self.stacks[number] = self.roster[number].stack
+
+        eliminated = [self.index[player] for player in game.eliminated[self.eliminated:]]
+        self.eliminated = len(game.eliminated)
+
+        seated, seatings = [], {}
+        for table in game.tables:
+            seatings[table.table_id] = seating = [self.index[player] for player in table]
+            if self.seatings.get(table.table_id) != seating:
+                seated.append(table.table_id)
+        self.seatings = seatings
+
+        return {
+            'round': [game.current_round, game.next_table_id],
+            'new_names': [player.name for player in new_players],
+            'new_initial': [player.initial_stack for player in new_players],
+            'stack_players': changed,
+            'stacks': [self.stacks[number] for number in changed],
+            'eliminated': eliminated,
+            'table_ids': [table.table_id for table in game.tables],
+            'buttons': [table.button for table in game.tables],
+            'hands_played': [table.hands_played for table in game.tables],
+            'seated_tables': seated,
+            'seat_counts': [len(seatings[table_id]) for table_id in seated],
+            'seats': [number for table_id in seated for number in seatings[table_id]],
+        }
+
+
+def _read_records(data, offset):
+    while offset + _RECORD.size <= len(data):
+        size, checksum = _RECORD.unpack_from(data, offset)
+        payload = data[offset + _RECORD.size:offset + _RECORD.size + size]
+        if len(payload) < size or zlib.crc32(payload) != checksum:
+            break
+        yield _decode(payload)
+        offset += _RECORD.size + size
+
+
+def load_game(file_name='tournament.snapshot', mccfr_strategy=None, config=None, **game_options):
+    """Турнир из полного снимка и дельт после него; продолжается с первого незаписанного круга.
+
+    Без mccfr_strategy решатель открывается из контрольной точки, записанной с полным
+    снимком, — вместе с регретами, набранными за турнир до него.
+    """
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    magic, version, generation, seed = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{file_name}: не снимок турнира")
+    if version != VERSION:
+        raise ValueError(f"{file_name}: неподдерживаемая версия формата {version}")
+    (size,) = _COUNT.unpack_from(data, _HEADER.size)
+    offset = _HEADER.size + _COUNT.size
+    strategy_file = data[offset:offset + size].decode('utf-8') or None
+    records = list(_read_records(data, offset + size))
+    if not records:
+        raise ValueError(f"{file_name}: в снимке нет целой записи")
+
+    delta_name = f"{file_name}.delta"
+    if os.path.exists(delta_name):
+        with open(delta_name, 'rb') as f:
+            delta = f.read()
+        if len(delta) >= _DELTA_HEADER.size and _DELTA_HEADER.unpack_from(delta) == (DELTA_MAGIC, VERSION, generation):
+            records.extend(_read_records(delta, _DELTA_HEADER.size))
+
+    if mccfr_strategy is None:
+        mccfr_strategy = MCCFR()
+        if strategy_file:
+            mccfr_strategy.load_strategy(strategy_file)
+
+    roster, stacks, active, eliminated, seatings = [], [], [], [], {}
+    for record in records:
+        current_round, next_table_id = record['round'].tolist()
+        for name, initial in zip(record['new_names'], record['new_initial'].tolist()):
+            active.append(len(roster))
+            roster.append(PokerPlayer(name, initial, mccfr_strategy=mccfr_strategy))
+            stacks.append(initial)
+        for number, stack in zip(record['stack_players'].tolist(), record['stacks'].tolist()):
+            stacks[number] = stack
+        gone = set(record['eliminated'].tolist())
+        active = [number for number in active if number not in gone]
+        eliminated.extend(record['eliminated'].tolist())
+        seats = iter(record['seats'].tolist())
+        for table_id, count in zip(record['seated_tables'].tolist(), record['seat_counts'].tolist()):
+            seatings[table_id] = [next(seats) for _ in range(count)]
+        tables = list(zip(record['table_ids'].tolist(), record['buttons'].tolist(), record['hands_played'].tolist()))
+
+    for player, stack in zip(roster, stacks):
+        player.stack = stack
+
+    game = PokerGame([roster[number] for number in active], config or PokerTournamentConfig(),
+                     mccfr_strategy=mccfr_strategy, **game_options)
+    game.seed = seed
+    game.current_round = current_round
+    game.next_table_id = next_table_id
+    game.eliminated = [roster[number] for number in eliminated]
+    game.tables = []
+    for table_id, button, hands_played in tables:
+        table = PokerTable(table_id, [roster[number] for number in seatings[table_id]], seed=game.table_seed(table_id))
+        table.button = button
+        table.hands_played = hands_played
+        game.tables.append(table)
+    game.seating = TablesBySize(game.tables)
+    return game
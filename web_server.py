@@ -1,17 +1,22 @@
-from flask import Flask, render_template, request, redirect
-from flask_socketio import SocketIO
+from flask import Flask, Response, render_template, request, redirect
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from player import PokerPlayer
 from poker_game import PokerGame, setup_tournament
 from mccfr import MCCFR
-from logging_system import Logger
+from logging_system import get_logger
+from instrumentation import metrics
+from state_broadcaster import TableStateBroadcaster, table_room
 import os
 
 app = Flask(__name__)
 socketio = SocketIO(app)
 
+# Не чаще одной рассылки за BROADCAST_INTERVAL секунд, только изменившиеся места
+broadcaster = TableStateBroadcaster(socketio, min_interval=float(os.environ.get('BROADCAST_INTERVAL', 0.5)))
+
 # Создаём объект турнира (глобальная переменная)
 tournament = None
-logger = Logger()
+logger = get_logger()
 
 @app.route('/')
 def index():
@@ -26,44 +31,76 @@ def register():
     global tournament
     if request.method == 'POST':
         player_name = request.form['player_name']
-        new_player = PokerPlayer(name=player_name, stack=10000)
-        tournament.players.append(new_player)
-        logger.log_event(f"Player {player_name} зарегистрирован.")
+        new_player = PokerPlayer(name=player_name, stack=10000, mccfr_strategy=tournament.mccfr_strategy)
+        tournament.add_player(new_player)
+        logger.log_event("Player %s зарегистрирован.", player_name)
         return redirect('/tournament')
 
     return render_template('player.html')
 
+@app.route('/metrics')
+def metrics_page():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 def update_tournament_state(state):
-    socketio.emit('update_tournament', state)
+    broadcaster.publish(state)
+
+@socketio.on('connect')
+def handle_connect():
+    emit('tables_index', broadcaster.index())
+
+@socketio.on('watch_table')
+def handle_watch_table(data):
+    previous = data.get('previous')
+    if previous is not None:
+        leave_room(table_room(previous))
+    join_room(table_room(data['table_id']))
+    emit('table_snapshot', broadcaster.snapshot(data['table_id']))
+
+@socketio.on('resync')
+def handle_resync(data):
+    emit('table_snapshot', broadcaster.snapshot(data['table_id']))
 
 @socketio.on('player_action')
 def handle_player_action(data):
     global tournament
-    player_name = data['player_name']
+    player_name = data.get('player_name')
     action = data['action']
     raise_value = data.get('raise', 0)
 
     for player in tournament.players:
         if player.name == player_name:
             if action == 'fold':
-                logger.log_event(f"Player {player_name} folded.")
+                logger.log_event("Player %s folded.", player_name)
             elif action == 'call':
-                logger.log_event(f"Player {player_name} called.")
+                logger.log_event("Player %s called.", player_name)
             elif action == 'raise':
-                logger.log_event(f"Player {player_name} raised by {raise_value}.")
+                logger.log_event("Player %s raised by %s.", player_name, raise_value)
             break
 
-    update_tournament_state(tournament.get_table_state())
+    update_tournament_state({'tables': tournament.get_table_state()})
+
+def run_tournament():
+    # Движок — фоновая задача сервера: паузы через socketio.sleep отдают управление обработчикам,
+    # а состояние уходит в очередь рассыльщика, так что клиенты не тормозят раздачи
+    for _ in tournament.tournament_steps():
+        socketio.sleep(tournament.action_delay)
+    logger.log_event("Турнир завершён")
 
 def start_flask():
+    broadcaster.start()
+    socketio.start_background_task(run_tournament)
     socketio.run(app, host='0.0.0.0', port=10000)
 
 if __name__ == "__main__":
     mccfr_strategy = MCCFR()
-    if os.path.exists('mccfr_strategy.pkl'):
-        mccfr_strategy.load_strategy('mccfr_strategy.pkl')
+    if os.path.exists('mccfr_strategy.bin'):
+        mccfr_strategy.load_strategy('mccfr_strategy.bin')
+    else:
+        mccfr_strategy.train(200000)
 
     tournament = setup_tournament(num_players=160, mccfr_strategy=mccfr_strategy)
+    tournament.state_listener = update_tournament_state
 
     # Запуск веб-сервера для взаимодействия через браузер
     start_flask()